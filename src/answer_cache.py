@@ -0,0 +1,197 @@
+"""
+answer_cache.py
+──────────────────────────────────────────────
+Semantic answer cache for Pokémon RAG system.
+Stores (query embedding, final answer, context fingerprint) in a dedicated
+Qdrant collection and serves paraphrased questions without calling the LLM.
+──────────────────────────────────────────────
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+from typing import Any, Dict
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from embedding_service import get_embedding_service
+from intent_cache import normalize_query
+
+# ───────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "pokedex-key")
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_COLLECTION = os.getenv("ANSWER_CACHE_COLLECTION", "pokedex_answer_cache")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SEC = float(os.getenv("ANSWER_CACHE_TTL_SEC", "3600"))
+# Bump after reloading MongoDB / Neo4j so answers built on old structured data stop matching
+ANSWER_CACHE_DATA_VERSION = os.getenv("ANSWER_CACHE_DATA_VERSION", "1")
+
+DENSE_MODEL = "jinaai/jina-embeddings-v2-small-en"
+DENSE_SIZE = 512
+POINT_NAMESPACE = uuid.UUID("6f1d3c2e-2b55-4d8e-9a57-4f2b8c7d1e90")
+
+
+# ───────────────────────────────────────────────
+# CONTEXT FINGERPRINT
+# ───────────────────────────────────────────────
+def context_fingerprint(context: Dict[str, Any]) -> str:
+    """
+    Hash of the *data version* behind the retrieved context, not of the result shape:
+    the sorted set of chunk text hashes, the sorted set of Mongo / Neo4j entities
+    and ANSWER_CACHE_DATA_VERSION. A paraphrase that retrieves the same chunks in
+    another order, or asks for slightly different attributes, still matches;
+    re-indexed chunks or a bumped data version do not.
+    """
+    chunks = set()
+    for r in context.get("semantic") or []:
+        payload = getattr(r, "payload", None) or {}
+        chunks.add(str(payload.get("text_hash") or payload.get("chunk_id") or getattr(r, "id", r)))
+
+    entities = {
+        str(item.get("entity") or "").strip().lower()
+        for item in (context.get("factual") or []) + (context.get("graph") or [])
+        if isinstance(item, dict)
+    }
+
+    material = json.dumps(
+        {
+            "semantic": sorted(chunks),
+            "entities": sorted(entities - {""}),
+            "data_version": ANSWER_CACHE_DATA_VERSION,
+        },
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def query_vector(query: str):
+    """Dense vector from the shared embedding service (LRU-cached), or a Document fallback."""
+    if (service := get_embedding_service()) is not None:
+        try:
+            return service.embed_query(query).dense
+        except Exception as e:
+            print(f"⚠️ Query embedding failed, using Document fallback: {e}")
+    return qmodels.Document(text=query, model=DENSE_MODEL)
+
+
+# ───────────────────────────────────────────────
+# CACHE
+# ───────────────────────────────────────────────
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        client,
+        collection: str = ANSWER_CACHE_COLLECTION,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: float = ANSWER_CACHE_TTL_SEC,
+    ):
+        self.client = client
+        self.collection = collection
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._ensure_collection()
+
+    def _ensure_collection(self):
+        if self.client.collection_exists(self.collection):
+            return
+        print(f"🧱 Creating answer cache collection '{self.collection}'...")
+        self.client.create_collection(
+            collection_name=self.collection,
+            vectors_config={
+                "jina-small": qmodels.VectorParams(size=DENSE_SIZE, distance=qmodels.Distance.COSINE),
+            },
+        )
+        self.client.create_payload_index(self.collection, "context_fingerprint", qmodels.PayloadSchemaType.KEYWORD)
+        self.client.create_payload_index(self.collection, "created_at", qmodels.PayloadSchemaType.FLOAT)
+
+    def lookup(self, query: str, fingerprint: str) -> Dict[str, Any] | None:
+        """Closest cached answer above the similarity threshold, fresh and built on the same context."""
+        results = self.client.query_points(
+            collection_name=self.collection,
+            query=query_vector(query),
+            using="jina-small",
+            query_filter=qmodels.Filter(must=[
+                qmodels.FieldCondition(key="context_fingerprint", match=qmodels.MatchValue(value=fingerprint)),
+                qmodels.FieldCondition(key="created_at", range=qmodels.Range(gte=time.time() - self.ttl)),
+            ]),
+            score_threshold=self.threshold,
+            limit=1,
+            with_payload=True,
+        ).points
+
+        if not results:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        payload = results[0].payload or {}
+        return {
+            "answer": payload.get("answer"),
+            "cached_query": payload.get("query"),
+            "similarity": round(results[0].score, 4),
+            "age_sec": round(time.time() - payload.get("created_at", time.time()), 1),
+        }
+
+    def store(self, query: str, answer: str, fingerprint: str):
+        point_id = str(uuid.uuid5(POINT_NAMESPACE, f"{normalize_query(query)}|{fingerprint}"))
+        self.client.upsert(
+            collection_name=self.collection,
+            points=[
+                qmodels.PointStruct(
+                    id=point_id,
+                    vector={"jina-small": query_vector(query)},
+                    payload={
+                        "query": query,
+                        "answer": answer,
+                        "context_fingerprint": fingerprint,
+                        "created_at": time.time(),
+                    },
+                )
+            ],
+        )
+
+    def purge_expired(self):
+        """Delete entries older than the TTL."""
+        self.client.delete(
+            collection_name=self.collection,
+            points_selector=qmodels.FilterSelector(filter=qmodels.Filter(must=[
+                qmodels.FieldCondition(key="created_at", range=qmodels.Range(lt=time.time() - self.ttl)),
+            ])),
+        )
+
+    def clear(self):
+        """Drop every cached answer (e.g. after a full re-index or graph reload)."""
+        self.client.delete_collection(self.collection)
+        self._ensure_collection()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "collection": self.collection,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+
+# ───────────────────────────────────────────────
+# MAINTENANCE
+# ───────────────────────────────────────────────
+if __name__ == "__main__":
+    cache = SemanticAnswerCache(QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY))
+    command = sys.argv[1] if len(sys.argv) > 1 else "purge"
+    if command == "clear":
+        cache.clear()
+        print(f"🗑️  Cleared answer cache '{cache.collection}'.")
+    else:
+        cache.purge_expired()
+        print(f"🧹 Purged expired entries from '{cache.collection}'.")
@@ -1,6 +1,8 @@
 # src/app_streamlit.py
 import os
 from datetime import datetime
+import altair as alt
+import pandas as pd
 import streamlit as st
 from qdrant_client import QdrantClient
 
@@ -8,10 +10,14 @@ from qdrant_client import QdrantClient
 # Project imports
 # ─────────────────────────────────────────────
 from intent_router import IntentRouter
-from hybrid_search_qdrant import hybrid_rrf_search
-from generate_answer import generate_answer
-# from mongo_query import query_mongo
-# from graph_query import query_neo4j
+from intent_fastpath import FastPathRouter, load_gazetteer
+from intent_distill import LocalIntentClassifier, DISTILL_MODEL_PATH
+from intent_cache import make_intent_cache
+from embedding_service import get_embedding_service
+from answer_cache import SemanticAnswerCache, context_fingerprint, ANSWER_CACHE_ENABLED
+from retrieval_orchestrator import retrieve_context, SpeculativeRetrieval, SPECULATIVE_RETRIEVAL
+from generate_answer import generate_answer_stream_from_context
+from tracing import request_trace, span, METRICS
 
 # ─────────────────────────────────────────────
 # PAGE CONFIG
@@ -78,9 +84,57 @@ except Exception as e:
     st.stop()
 
 # ─────────────────────────────────────────────
-# INTENT ROUTER
+# QUERY EMBEDDING SERVICE (preload + warmup at startup)
 # ─────────────────────────────────────────────
-router = IntentRouter()
+@st.cache_resource(show_spinner="🔥 Warming up embedding models...")
+def get_warm_embedding_service():
+    try:
+        service = get_embedding_service()
+        return service.warmup() if service is not None else None
+    except Exception as e:
+        print(f"⚠️ Embedding warmup failed: {e}")
+        return None
+
+embedding_service = get_warm_embedding_service()
+
+# ─────────────────────────────────────────────
+# INTENT ROUTER (gazetteer fast path → LLM fallback)
+# ─────────────────────────────────────────────
+@st.cache_resource(show_spinner="📖 Building Pokémon gazetteer...")
+def get_gazetteer():
+    return load_gazetteer()
+
+@st.cache_resource(show_spinner="🧠 Loading local intent classifier...")
+def get_local_classifier():
+    if not os.path.exists(DISTILL_MODEL_PATH):
+        return None
+    return LocalIntentClassifier.load(DISTILL_MODEL_PATH)
+
+@st.cache_resource
+def get_intent_cache():
+    return make_intent_cache()
+
+gazetteer = get_gazetteer()
+intent_cache = get_intent_cache()
+pre_routers = [FastPathRouter(gazetteer)]
+if (local_classifier := get_local_classifier()) is not None:
+    pre_routers.append(local_classifier)
+router = IntentRouter(pre_routers=pre_routers, cache=intent_cache)
+
+# ─────────────────────────────────────────────
+# SEMANTIC ANSWER CACHE
+# ─────────────────────────────────────────────
+@st.cache_resource
+def get_answer_cache():
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    try:
+        return SemanticAnswerCache(qdrant_client)
+    except Exception as e:
+        print(f"⚠️ Semantic answer cache disabled: {e}")
+        return None
+
+answer_cache = get_answer_cache()
 
 # ─────────────────────────────────────────────
 # LAYOUT: TABS
@@ -97,6 +151,8 @@ with tab_chat:
     for msg in st.session_state["messages"]:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
+            if msg.get("cached"):
+                st.caption("⚡ Served from semantic answer cache")
 
 # ─────────────────────────────────────────────
 # CHAT INPUT (fixed at bottom)
@@ -112,46 +168,95 @@ if user_query := st.chat_input("Ask something about Pokémon..."):
 
         with st.chat_message("assistant"):
             placeholder = st.empty()
+            trace = None
             try:
-                placeholder.markdown("🧠 **Step 1/4 — Analyzing intents...**")
-                intents = router.extract_intents(user_query)
-                st.session_state["router_log"].append(router.history[-1])
-
-                placeholder.markdown("📚 **Step 2/4 — Querying Qdrant (semantic search)...**")
-                semantic_results = hybrid_rrf_search(
-                    client=qdrant_client,
-                    query=user_query,
-                    limit=3
-                )
+                # One trace per question: router, stores, prompt and LLM spans join it
+                with request_trace("chat", query=user_query) as trace:
+                    # Speculative mode: retrieval starts now and overlaps with intent extraction
+                    speculation = None
+                    if SPECULATIVE_RETRIEVAL:
+                        speculation = SpeculativeRetrieval(
+                            user_query,
+                            qdrant_client=qdrant_client,
+                            limit=3,
+                            entity_detector=gazetteer.detect_entities,
+                        )
 
-                placeholder.markdown("📄 **Step 3/4 — Fetching factual & graph data...**")
-                factual_results = []  # query_mongo(intents)
-                graph_results = []    # query_neo4j(intents)
+                    placeholder.markdown("🧠 **Step 1/3 — Analyzing intents...**")
+                    try:
+                        intents = router.extract_intents(user_query)
+                    except Exception:
+                        if speculation:
+                            speculation.cancel()
+                        raise
+                    st.session_state["router_log"].append(router.history[-1])
 
-                placeholder.markdown("🤖 **Step 4/4 — Generating final answer...**")
-                final_answer = generate_answer(
-                    user_query,
-                    semantic_results=semantic_results,
-                    factual_docs=factual_results,
-                    graph_relations=graph_results,
-                )
+                    placeholder.markdown("📚 **Step 2/3 — Querying Qdrant, MongoDB & Neo4j in parallel...**")
+                    if speculation:
+                        context = speculation.resolve(intents)
+                    else:
+                        context = retrieve_context(
+                            user_query,
+                            intents,
+                            qdrant_client=qdrant_client,
+                            limit=3,
+                        )
 
-                placeholder.markdown(final_answer)  # replace progress with final answer
-                st.session_state["messages"].append(
-                    {"role": "assistant", "content": final_answer, "time": datetime.now().isoformat()}
-                )
+                    # Semantic answer cache: same meaning + same retrieved context → reuse the answer
+                    fingerprint = context_fingerprint(context)
+                    cached = None
+                    if answer_cache:
+                        with span("answer_cache.lookup") as s_cache:
+                            try:
+                                cached = answer_cache.lookup(user_query, fingerprint)
+                            except Exception as e:
+                                print(f"⚠️ Answer cache lookup failed: {e}")
+                            s_cache.set(hit=bool(cached))
 
-                st.session_state["last_query"] = {
-                    "query": user_query,
-                    "intents": intents,
-                    "semantic": semantic_results,
-                    "factual": factual_results,
-                    "graph": graph_results,
-                    "answer": final_answer,
-                }
+                    if cached:
+                        final_answer = cached["answer"]
+                        placeholder.markdown(final_answer)
+                        st.caption(f"⚡ Served from semantic answer cache (similarity {cached['similarity']:.2f})")
+                    else:
+                        placeholder.markdown("🤖 **Step 3/3 — Generating final answer...**")
+                        final_answer = ""
+                        for delta in generate_answer_stream_from_context(context):
+                            final_answer += delta
+                            placeholder.markdown(final_answer + "▌")  # render tokens as they arrive
+                        final_answer = final_answer.strip()
+                        placeholder.markdown(final_answer)
+                        if answer_cache:
+                            # The answer is already on screen: a cache failure must not lose it
+                            try:
+                                answer_cache.store(user_query, final_answer, fingerprint)
+                            except Exception as e:
+                                print(f"⚠️ Answer cache store failed: {e}")
+
+                    st.session_state["messages"].append({
+                        "role": "assistant",
+                        "content": final_answer,
+                        "time": datetime.now().isoformat(),
+                        "cached": bool(cached),
+                    })
+
+                    st.session_state["last_query"] = {
+                        **context,
+                        "answer": final_answer,
+                        "router": router.history[-1].get("router", "llm"),
+                        "answer_cache": cached,
+                    }
 
             except Exception as e:
                 placeholder.markdown(f"❌ **Error:** {e}")
+                st.session_state["last_query"] = {
+                    "intents": {}, "semantic": [], "factual": [], "graph": [], "answer": "",
+                    "errors": {"request": f"{type(e).__name__}: {e}"},
+                }
+            finally:
+                # Failed requests are exported too — they are the ones worth debugging
+                if trace is not None:
+                    st.session_state["last_query"]["trace"] = trace.to_rows()
+                    trace.export_jsonl()
 
 # ─────────────────────────────────────────────
 # TAB 2 — DEBUG MODE
@@ -163,6 +268,9 @@ with tab_debug:
         last = st.session_state["last_query"]
 
         with st.expander("🧭 Intent Router Output", expanded=False):
+            st.caption(f"Routed by: {last.get('router', 'llm')}")
+            if intent_cache is not None:
+                st.caption(f"Intent cache: {intent_cache.stats()}")
             st.json(last["intents"])
 
         with st.expander("📚 Semantic Search (Qdrant)", expanded=False):
@@ -184,6 +292,49 @@ with tab_debug:
             else:
                 st.info("No graph results returned.")
 
+        with st.expander("⏱️ Retrieval Timings", expanded=False):
+            st.json({
+                "elapsed_sec": last.get("elapsed_sec"),
+                "stages": last.get("timings", {}),
+                "errors": last.get("errors", {}),
+                "speculation": last.get("speculation"),
+            })
+
+        with st.expander("📊 Latency Waterfall", expanded=False):
+            rows = last.get("trace") or []
+            if rows:
+                df = pd.DataFrame(rows)
+                df["end_ms"] = df["start_ms"] + df["duration_ms"]
+                chart = (
+                    alt.Chart(df)
+                    .mark_bar()
+                    .encode(
+                        x=alt.X("start_ms:Q", title="ms since request start"),
+                        x2="end_ms:Q",
+                        y=alt.Y("name:N", sort=None, title=None),
+                        color=alt.Color("thread:N", legend=None),
+                        tooltip=["name", "start_ms", "duration_ms", "thread", "error"],
+                    )
+                )
+                st.altair_chart(chart, use_container_width=True)
+                st.dataframe(df[["name", "start_ms", "duration_ms", "thread", "error"]], hide_index=True)
+                st.json({r["name"]: r["attrs"] for r in rows if r["attrs"]})
+            else:
+                st.info("No trace recorded for this question.")
+            st.caption("Span latency percentiles (ms, this process)")
+            st.json(METRICS.summary())
+            st.code(METRICS.render_prometheus(), language="text")
+            if embedding_service is not None:
+                st.caption(f"Query embedding service: {embedding_service.stats()}")
+
+        with st.expander("⚡ Semantic Answer Cache", expanded=False):
+            if last.get("answer_cache"):
+                st.json(last["answer_cache"])
+            else:
+                st.info("Answer was generated by the LLM (cache miss).")
+            if answer_cache is not None:
+                st.caption(f"Answer cache: {answer_cache.stats()}")
+
         with st.expander("🧠 Final Answer", expanded=True):
             st.write(last["answer"])
     else:
@@ -0,0 +1,32 @@
+"""
+chunk_ids.py
+──────────────────────────────────────────────
+Deterministic chunk identifiers for Pokémon RAG system.
+The same (document, section, text) always maps to the same Qdrant point id,
+so re-chunking or re-indexing unchanged content is a no-op.
+──────────────────────────────────────────────
+"""
+
+import uuid
+import hashlib
+from typing import Dict
+
+CHUNK_NAMESPACE = uuid.UUID("0b3f6a52-9d4e-4c1a-8f67-2e5d9c8b7a14")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(document_name: str, section_name: str | None, text: str) -> str:
+    """uuid5 over document, section and text hash."""
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{document_name}|{section_name or ''}|{text_hash(text)}"))
+
+
+def with_ids(record: Dict) -> Dict:
+    """Fill chunk_id / text_hash on a chunk record (also upgrades legacy uuid4 records)."""
+    return {
+        **record,
+        "chunk_id": chunk_id(record["document_name"], record.get("section_name"), record["text"]),
+        "text_hash": text_hash(record["text"]),
+    }
@@ -1,30 +1,65 @@
 import pandas as pd
 from pathlib import Path
-import json
+
+from pokedex_io import (
+    EVOLUTIONS_SCHEMA,
+    POKEDEX_SCHEMA,
+    TYPE_RELATIONS_SCHEMA,
+    StreamingWriter,
+    iter_batches,
+    output_path,
+    write_table,
+)
+
+CONSOLIDATED_DIR = Path("data/structured/consolidated")
 
 # ╔════════════════════════════════════════════════════════════╗
 # ║               UNIFY ALL BATCHES INTO ONE FILE              ║
 # ╚════════════════════════════════════════════════════════════╝
 
-def consolidate_pokedex_batches(base_dir="data/structured/batches"):
-    batch_files = sorted(Path(base_dir).glob("pokedex_batch_*.csv"))
+def find_batches(base_dir, prefix):
+    """
+    Batches Parquet (nuevos) y CSV (corridas previas) en orden de batch.
+    Un batch reescrito deja ambos archivos: se usa solo el Parquet.
+    """
+    by_stem = {}
+    for f in Path(base_dir).glob(f"{prefix}_*.csv"):
+        by_stem[f.stem] = f
+    for f in Path(base_dir).glob(f"{prefix}_*.parquet"):
+        by_stem[f.stem] = f
+    return [by_stem[stem] for stem in sorted(by_stem)]
+
+
+def consolidate_pokedex_batches(base_dir="data/structured/batches", out_path=None):
+    """
+    Escribe el consolidado batch a batch (sin concatenar todo en memoria) en
+    `out_path` (por defecto data/structured/consolidated/pokedex_full.<formato>).
+    Devuelve el número de registros escritos (ya no un DataFrame: el consolidado
+    completo nunca está en memoria; leerlo con pokedex_io.iter_records).
+    """
+    if out_path is None:
+        CONSOLIDATED_DIR.mkdir(parents=True, exist_ok=True)
+        out_path = output_path(CONSOLIDATED_DIR, "pokedex_full")
+    batch_files = find_batches(base_dir, "pokedex_batch")
     if not batch_files:
-        raise FileNotFoundError("❌ No se encontraron archivos pokedex_batch_*.csv")
+        raise FileNotFoundError("❌ No se encontraron archivos pokedex_batch_*.parquet / .csv")
 
     print(f"🔍 Encontrados {len(batch_files)} archivos de batch.")
-    dfs = [pd.read_csv(f) for f in batch_files]
-    df = pd.concat(dfs, ignore_index=True)
-    print(f"✅ Consolidado: {len(df)} registros totales de Pokémon.")
-    return df
+    with StreamingWriter(out_path, POKEDEX_SCHEMA) as writer:
+        for f in batch_files:
+            for batch in iter_batches(f, columns=POKEDEX_SCHEMA.names, schema=POKEDEX_SCHEMA):
+                writer.write(batch)
+    print(f"✅ Consolidado: {writer.rows} registros totales de Pokémon.")
+    return writer.rows
 
 
 def consolidate_evolutions(base_dir="data/structured/batches"):
-    evo_files = sorted(Path(base_dir).glob("evolutions_batch_*.csv"))
+    evo_files = find_batches(base_dir, "evolutions_batch")
     if not evo_files:
         print("⚠️ No se encontraron archivos de evolución.")
         return pd.DataFrame(columns=["source", "target"])
-    
-    dfs = [pd.read_csv(f) for f in evo_files]
+
+    dfs = [b.to_pandas() for b in iter_batches(evo_files, columns=EVOLUTIONS_SCHEMA.names)]
     df = pd.concat(dfs, ignore_index=True).drop_duplicates()
     print(f"✅ Consolidado: {len(df)} relaciones de evolución.")
     return df
@@ -37,16 +72,12 @@ def load_type_relations(file_path="data/structured/type_relations.csv"):
 
 
 if __name__ == "__main__":
-    df_pokedex = consolidate_pokedex_batches()
-    df_evo = consolidate_evolutions()
-    df_types = load_type_relations()
-
-    # Guardar todo en un archivo único
-    out_dir = Path("data/structured/consolidated")
+    out_dir = CONSOLIDATED_DIR
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    df_pokedex.to_csv(out_dir / "pokedex_full.csv", index=False)
-    df_evo.to_csv(out_dir / "evolutions_full.csv", index=False)
-    df_types.to_csv(out_dir / "type_relations_full.csv", index=False)
+    # Guardar todo en un archivo único (Parquet tipado; CSV si PIPELINE_FORMAT=csv)
+    consolidate_pokedex_batches(out_path=output_path(out_dir, "pokedex_full"))
+    write_table(consolidate_evolutions(), output_path(out_dir, "evolutions_full"), EVOLUTIONS_SCHEMA)
+    write_table(load_type_relations(), output_path(out_dir, "type_relations_full"), TYPE_RELATIONS_SCHEMA)
 
     print(f"\n💾 Guardado en {out_dir}/ (Pokémon, evoluciones y tipos).")
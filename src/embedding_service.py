@@ -0,0 +1,209 @@
+"""
+embedding_service.py
+──────────────────────────────────────────────
+In-process query embedding service for Pokémon RAG system.
+- Preloads the fastembed models (jina dense + BM25) from a local model dir
+- Microbatches concurrent queries into one ONNX call per model
+- LRU cache of query vectors (repeated / popular questions skip inference)
+- Returns raw vectors, so query_points never embeds on its own
+
+Usage:
+    uv run python src/embedding_service.py download   # fill EMBEDDING_MODEL_DIR once
+    uv run python src/embedding_service.py bench      # cold start + per-query latency
+──────────────────────────────────────────────
+"""
+
+import os
+import sys
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import List
+
+from qdrant_client.http import models as qmodels
+
+from tracing import span
+
+# ───────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────
+DENSE_MODEL = "jinaai/jina-embeddings-v2-small-en"
+SPARSE_MODEL = "Qdrant/bm25"
+EMBEDDING_SERVICE_ENABLED = os.getenv("EMBEDDING_SERVICE_ENABLED", "1") == "1"
+EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", "models/fastembed")
+# Only read EMBEDDING_MODEL_DIR (no download) — set once the dir is populated
+EMBEDDING_LOCAL_ONLY = os.getenv("EMBEDDING_LOCAL_ONLY", "0") == "1"
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", str(min(4, os.cpu_count() or 1))))
+EMBEDDING_LRU_SIZE = int(os.getenv("EMBEDDING_LRU_SIZE", "2048"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "3"))
+
+
+def load_models(local_only: bool = EMBEDDING_LOCAL_ONLY, threads: int | None = EMBEDDING_THREADS):
+    """(TextEmbedding, SparseTextEmbedding) from EMBEDDING_MODEL_DIR; threads=None lets ONNX use every core."""
+    from fastembed import SparseTextEmbedding, TextEmbedding
+
+    options = {"cache_dir": EMBEDDING_MODEL_DIR, "threads": threads, "local_files_only": local_only}
+    return TextEmbedding(model_name=DENSE_MODEL, **options), SparseTextEmbedding(model_name=SPARSE_MODEL, **options)
+
+
+@dataclass
+class QueryVectors:
+    dense: List[float]
+    sparse: qmodels.SparseVector
+
+
+# ───────────────────────────────────────────────
+# SERVICE
+# ───────────────────────────────────────────────
+class EmbeddingService:
+    def __init__(
+        self,
+        max_batch: int = EMBEDDING_MAX_BATCH,
+        window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+        lru_size: int = EMBEDDING_LRU_SIZE,
+    ):
+        started = time.perf_counter()
+        self.dense_model, self.sparse_model = load_models()
+        self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.warmup_ms = None
+
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.lru_size = lru_size
+        self._lru: OrderedDict[str, QueryVectors] = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self.hits = self.misses = self.batches = self.batched_queries = 0
+
+        threading.Thread(target=self._worker, name="embedding-batcher", daemon=True).start()
+
+    # ── cache ────────────────────────────────────
+    def _cached(self, text: str) -> QueryVectors | None:
+        with self._lru_lock:
+            vectors = self._lru.get(text)
+            if vectors is not None:
+                self._lru.move_to_end(text)
+            return vectors
+
+    def _remember(self, text: str, vectors: QueryVectors):
+        with self._lru_lock:
+            self._lru[text] = vectors
+            self._lru.move_to_end(text)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    # ── microbatching ────────────────────────────
+    def _embed_many(self, texts: List[str]) -> List[QueryVectors]:
+        dense = self.dense_model.query_embed(texts)
+        sparse = self.sparse_model.query_embed(texts)
+        return [
+            QueryVectors(
+                dense=dv.tolist(),
+                sparse=qmodels.SparseVector(indices=sv.indices.tolist(), values=sv.values.tolist()),
+            )
+            for dv, sv in zip(dense, sparse)
+        ]
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                by_text = dict(zip(texts, self._embed_many(texts)))
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_queries += len(batch)
+            for text, fut in batch:
+                self._remember(text, by_text[text])
+                fut.set_result(by_text[text])
+
+    def embed_query(self, query: str) -> QueryVectors:
+        text = query.strip()
+        with span("embed.query", query_chars=len(text)) as s:
+            vectors = self._cached(text)
+            s.set(cached=vectors is not None)
+            if vectors is not None:
+                self.hits += 1
+                return vectors
+            self.misses += 1
+            fut: Future = Future()
+            self._queue.put((text, fut))
+            return fut.result()
+
+    def warmup(self):
+        """One throwaway query so the first real request skips ONNX session init."""
+        started = time.perf_counter()
+        self._embed_many(["warmup query: how does eevee evolve?"])
+        self.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+        return self
+
+    def stats(self) -> dict:
+        return {
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "threads": EMBEDDING_THREADS,
+            "lru_size": len(self._lru),
+            "hits": self.hits,
+            "misses": self.misses,
+            "avg_batch": round(self.batched_queries / self.batches, 2) if self.batches else None,
+        }
+
+
+_service: EmbeddingService | None = None
+_service_failed = False
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService | None:
+    """
+    Shared per-process service. None when EMBEDDING_SERVICE_ENABLED=0 or when
+    loading the models failed once (callers fall back to server-side Documents
+    instead of retrying the load on every request).
+    """
+    global _service, _service_failed
+    if not EMBEDDING_SERVICE_ENABLED or _service_failed:
+        return None
+    if _service is None:
+        with _service_lock:
+            if _service is None and not _service_failed:
+                try:
+                    _service = EmbeddingService()
+                except Exception as e:
+                    _service_failed = True
+                    print(f"⚠️ Embedding service disabled (model load failed): {e}")
+    return _service
+
+
+# ───────────────────────────────────────────────
+# MAINTENANCE
+# ───────────────────────────────────────────────
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "download":
+        load_models(local_only=False)
+        print(f"📦 Models cached in {EMBEDDING_MODEL_DIR} — set EMBEDDING_LOCAL_ONLY=1 to run offline.")
+    else:
+        service = EmbeddingService().warmup()
+        queries = ["how does eevee evolve", "what is pikachu weak against", "best moves for charizard"]
+        for q in queries * 2:
+            started = time.perf_counter()
+            service.embed_query(q)
+            print(f"  {(time.perf_counter() - started) * 1000:7.2f} ms  {q}")
+        print(service.stats())
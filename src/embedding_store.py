@@ -0,0 +1,297 @@
+"""
+embedding_store.py
+──────────────────────────────────────────────
+Persistent local embedding store for the Qdrant indexer.
+Keyed by (model name, text hash), so unchanged chunks are never re-embedded.
+
+Layout (one directory per model under EMBEDDING_STORE_DIR):
+    <kind>/<model>/meta.json    → model name (+ dim for dense)
+    dense/<model>/vectors.f32   → float32 matrix (rows × dim), read via np.memmap
+    dense/<model>/index.tsv     → text_hash \t row
+    sparse/<model>/indices.i32  → concatenated int32 token ids
+    sparse/<model>/values.f32   → concatenated float32 weights
+    sparse/<model>/index.tsv    → text_hash \t offset \t length
+
+Data files are append-only; the index line is written after the data, so a
+crashed run leaves at most unreferenced bytes (trimmed on next open). Index
+entries pointing past the end of a data file are dropped on open, never padded.
+
+Usage:
+    uv run python src/embedding_store.py stats
+    uv run python src/embedding_store.py export embeddings.tar.gz
+    uv run python src/embedding_store.py import embeddings.tar.gz
+──────────────────────────────────────────────
+"""
+
+import os
+import sys
+import json
+import tarfile
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# ───────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "data/cache/embeddings")
+# Entries read per step when streaming a store (export/import never hold it all in RAM)
+EMBEDDING_STORE_CHUNK = int(os.getenv("EMBEDDING_STORE_CHUNK", "4096"))
+
+
+def model_dir_name(model: str) -> str:
+    return model.replace("/", "__")
+
+
+def _read_index(path: Path) -> List[List[str]]:
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n").split("\t") for line in f if line.strip()]
+
+
+def _write_index(path: Path, rows: Iterable[Tuple]):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write("\t".join(map(str, row)) + "\n")
+    os.replace(tmp, path)
+
+
+def _file_size(path: Path) -> int:
+    return path.stat().st_size if path.exists() else 0
+
+
+# ───────────────────────────────────────────────
+# DENSE
+# ───────────────────────────────────────────────
+class DenseStore:
+    """Append-only float32 matrix + text_hash → row index."""
+
+    def __init__(self, root: Path, dim: int, model: str = ""):
+        self.root = root
+        self.dim = dim
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = root / "vectors.f32"
+        self.index_path = root / "index.tsv"
+        self._lock = threading.Lock()
+        self._matrix = None
+
+        meta_path = root / "meta.json"
+        if meta_path.exists():
+            stored = json.loads(meta_path.read_text())["dim"]
+            if stored != dim:
+                raise ValueError(f"❌ {root} holds {stored}-d vectors, expected {dim}")
+        else:
+            meta_path.write_text(json.dumps({"model": model, "dim": dim}))
+
+        self.index: Dict[str, int] = {h: int(row) for h, row in _read_index(self.index_path)}
+        # Drop index entries whose row never fully reached disk (lost or cut data file)
+        row_bytes = dim * 4
+        on_disk = _file_size(self.vectors_path) // row_bytes
+        if any(row >= on_disk for row in self.index.values()):
+            self.index = {h: row for h, row in self.index.items() if row < on_disk}
+            _write_index(self.index_path, self.index.items())
+        self.rows = max(self.index.values(), default=-1) + 1
+        # Drop rows written without an index line (interrupted run)
+        if _file_size(self.vectors_path) > self.rows * row_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(self.rows * row_bytes)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _mapped(self):
+        if self._matrix is None or self._matrix.shape[0] < self.rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        return self._matrix
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            hits = {h: self.index[h] for h in hashes if h in self.index}
+            if not hits:
+                return {}
+            matrix = self._mapped()
+            return {h: np.array(matrix[row]) for h, row in hits.items()}
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]):
+        with self._lock:
+            new = list({h: np.asarray(v, dtype=np.float32) for h, v in items if h not in self.index}.items())
+            if not new:
+                return 0
+            bad = next((vec.shape for _, vec in new if vec.shape != (self.dim,)), None)
+            if bad:
+                raise ValueError(f"❌ Expected a {self.dim}-d vector, got {bad}")
+            with open(self.vectors_path, "ab") as f:
+                for _, vec in new:
+                    f.write(vec.tobytes())
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                for i, (h, _) in enumerate(new):
+                    f.write(f"{h}\t{self.rows + i}\n")
+                    self.index[h] = self.rows + i
+            self.rows += len(new)
+            return len(new)
+
+    def chunks(self, size: int = EMBEDDING_STORE_CHUNK):
+        """{text_hash: vector} dicts of at most `size` entries."""
+        hashes = list(self.index)
+        for start in range(0, len(hashes), size):
+            yield self.get_many(hashes[start:start + size])
+
+
+# ───────────────────────────────────────────────
+# SPARSE
+# ───────────────────────────────────────────────
+class SparseStore:
+    """Append-only indices/values files + text_hash → (offset, length) index."""
+
+    def __init__(self, root: Path, model: str = ""):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        meta_path = root / "meta.json"
+        if not meta_path.exists():
+            meta_path.write_text(json.dumps({"model": model}))
+        self.indices_path = root / "indices.i32"
+        self.values_path = root / "values.f32"
+        self.index_path = root / "index.tsv"
+        self._lock = threading.Lock()
+
+        self.index: Dict[str, Tuple[int, int]] = {
+            h: (int(offset), int(length)) for h, offset, length in _read_index(self.index_path)
+        }
+        # Drop index entries whose slice never fully reached disk (lost or cut data file)
+        on_disk = min(_file_size(self.indices_path), _file_size(self.values_path)) // 4
+        if any(o + n > on_disk for o, n in self.index.values()):
+            self.index = {h: (o, n) for h, (o, n) in self.index.items() if o + n <= on_disk}
+            _write_index(self.index_path, ((h, o, n) for h, (o, n) in self.index.items()))
+        self.size = max((o + n for o, n in self.index.values()), default=0)
+        # Drop values written without an index line (interrupted run)
+        for path in (self.indices_path, self.values_path):
+            if _file_size(path) > self.size * 4:
+                with open(path, "r+b") as f:
+                    f.truncate(self.size * 4)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _mapped(self, path: Path, dtype):
+        return np.memmap(path, dtype=dtype, mode="r", shape=(self.size,))
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            hits = {h: self.index[h] for h in hashes if h in self.index}
+            if not hits or not self.size:
+                return {h: (np.empty(0, np.int32), np.empty(0, np.float32)) for h in hits}
+            indices = self._mapped(self.indices_path, np.int32)
+            values = self._mapped(self.values_path, np.float32)
+            return {
+                h: (np.array(indices[o:o + n]), np.array(values[o:o + n]))
+                for h, (o, n) in hits.items()
+            }
+
+    def put_many(self, items: Iterable[Tuple[str, Tuple[np.ndarray, np.ndarray]]]):
+        with self._lock:
+            new = [
+                (h, np.asarray(i, dtype=np.int32), np.asarray(v, dtype=np.float32))
+                for h, (i, v) in dict(items).items() if h not in self.index
+            ]
+            if not new:
+                return 0
+            with open(self.indices_path, "ab") as fi, open(self.values_path, "ab") as fv:
+                for _, idx, val in new:
+                    fi.write(idx.tobytes())
+                    fv.write(val.tobytes())
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                for h, idx, _ in new:
+                    f.write(f"{h}\t{self.size}\t{len(idx)}\n")
+                    self.index[h] = (self.size, len(idx))
+                    self.size += len(idx)
+            return len(new)
+
+    def chunks(self, size: int = EMBEDDING_STORE_CHUNK):
+        """{text_hash: (indices, values)} dicts of at most `size` entries."""
+        hashes = list(self.index)
+        for start in range(0, len(hashes), size):
+            yield self.get_many(hashes[start:start + size])
+
+
+# ───────────────────────────────────────────────
+# STORE
+# ───────────────────────────────────────────────
+class EmbeddingStore:
+    def __init__(self, root: str = EMBEDDING_STORE_DIR):
+        self.root = Path(root)
+        self._dense: Dict[str, DenseStore] = {}
+        self._sparse: Dict[str, SparseStore] = {}
+
+    def dense(self, model: str, dim: int) -> DenseStore:
+        if model not in self._dense:
+            self._dense[model] = DenseStore(self.root / "dense" / model_dir_name(model), dim, model)
+        return self._dense[model]
+
+    def sparse(self, model: str) -> SparseStore:
+        if model not in self._sparse:
+            self._sparse[model] = SparseStore(self.root / "sparse" / model_dir_name(model), model)
+        return self._sparse[model]
+
+    def _open_all(self):
+        for kind in ("dense", "sparse"):
+            base = self.root / kind
+            if not base.exists():
+                continue
+            for d in sorted(p for p in base.iterdir() if p.is_dir()):
+                meta = json.loads((d / "meta.json").read_text())
+                model = meta.get("model") or d.name
+                if kind == "dense":
+                    self.dense(model, meta["dim"])
+                else:
+                    self.sparse(model)
+
+    def stats(self) -> dict:
+        self._open_all()
+        return {
+            "path": str(self.root),
+            "dense": {m: len(s) for m, s in self._dense.items()},
+            "sparse": {m: len(s) for m, s in self._sparse.items()},
+        }
+
+    def export(self, archive: str):
+        """Packs the whole store into a tar.gz another node can import."""
+        with tarfile.open(archive, "w:gz") as tar:
+            for kind in ("dense", "sparse"):
+                if (self.root / kind).exists():
+                    tar.add(self.root / kind, arcname=kind)
+
+    def import_archive(self, archive: str) -> dict:
+        """Merges an exported archive into this store (existing keys win)."""
+        added = {"dense": 0, "sparse": 0}
+        with tempfile.TemporaryDirectory() as tmp, tarfile.open(archive, "r:gz") as tar:
+            tar.extractall(tmp, filter="data")
+            other = EmbeddingStore(tmp)
+            other._open_all()
+            for model, src in other._dense.items():
+                dst = self.dense(model, src.dim)
+                for chunk in src.chunks():
+                    added["dense"] += dst.put_many(chunk.items())
+            for model, src in other._sparse.items():
+                dst = self.sparse(model)
+                for chunk in src.chunks():
+                    added["sparse"] += dst.put_many(chunk.items())
+        return added
+
+
+# ───────────────────────────────────────────────
+# MAINTENANCE
+# ───────────────────────────────────────────────
+if __name__ == "__main__":
+    store = EmbeddingStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "export":
+        store.export(sys.argv[2])
+        print(f"📦 Exported {store.root} → {sys.argv[2]}")
+    elif command == "import":
+        print(f"📥 Imported {store.import_archive(sys.argv[2])} new vectors from {sys.argv[2]}")
+    print(store.stats())
@@ -1,28 +1,22 @@
-import pandas as pd
-import ast
-from pathlib import Path
+from pokedex_io import FLAT_SCHEMA, STAT_NAMES, StreamingWriter, find_table, iter_records, output_path
 
-def safe_eval(val):
-    """Convierte strings tipo lista/dict en estructuras Python seguras."""
-    try:
-        return ast.literal_eval(val) if isinstance(val, str) else val
-    except Exception:
-        return None
+# Solo se leen las columnas necesarias del consolidado (proyección)
+SOURCE_COLUMNS = ["id", "name", "species_name", "types", "abilities", "stats", "height", "weight", "species"]
 
 def extract_types(tlist):
     if isinstance(tlist, list):
-        return ", ".join(t["type"]["name"] for t in tlist if "type" in t)
+        return ", ".join(t["type"]["name"] for t in tlist if t.get("type"))
     return None
 
 def extract_abilities(alist):
     if isinstance(alist, list):
-        return ", ".join(a["ability"]["name"] for a in alist if "ability" in a)
+        return ", ".join(a["ability"]["name"] for a in alist if a.get("ability"))
     return None
 
 def extract_stat(stats, name):
     if isinstance(stats, list):
         for s in stats:
-            if s.get("stat", {}).get("name") == name:
+            if (s.get("stat") or {}).get("name") == name:
                 return s.get("base_stat")
     return None
 
@@ -31,39 +25,37 @@ def extract_species_field(sdict, key):
         return sdict.get(key)
     return None
 
-def flatten_pokedex(input_path="data/structured/consolidated/pokedex_full.csv"):
-    print("🔄 Cargando dataset completo...")
-    df = pd.read_csv(input_path)
+def flatten_record(rec):
+    row = {
+        "id": rec.get("id"),
+        "name": rec.get("name"),
+        "species_name": rec.get("species_name"),
+        "type_names": extract_types(rec.get("types")),
+        "ability_names": extract_abilities(rec.get("abilities")),
+    }
+    for stat_name in STAT_NAMES:
+        row[stat_name] = extract_stat(rec.get("stats"), stat_name)
+    row["height"] = rec.get("height")
+    row["weight"] = rec.get("weight")
+    row["generation"] = extract_species_field(rec.get("species"), "generation")
+    row["description"] = extract_species_field(rec.get("species"), "description")
+    return row
+
+def flatten_pokedex(input_dir="data/structured/consolidated"):
+    input_path = find_table(input_dir, "pokedex_full")
+    out_path = output_path(input_dir, "pokedex_flatten")
+    print(f"🔄 Leyendo {input_path} por batches...")
+
+    # Los campos anidados ya vienen tipados (Parquet) o se parsean al leer (CSV heredado)
+    with StreamingWriter(out_path, FLAT_SCHEMA) as writer:
+        for records in iter_records(input_path, columns=SOURCE_COLUMNS):
+            writer.write([flatten_record(rec) for rec in records])
 
-    print("🧩 Transformando columnas JSON...")
-    for col in ["types", "abilities", "stats", "species"]:
-        df[col] = df[col].apply(safe_eval)
-
-    print("✨ Extrayendo columnas derivadas...")
-    df["type_names"] = df["types"].apply(extract_types)
-    df["ability_names"] = df["abilities"].apply(extract_abilities)
-
-    for stat_name in ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]:
-        df[stat_name] = df["stats"].apply(lambda x: extract_stat(x, stat_name))
-
-    df["generation"] = df["species"].apply(lambda s: extract_species_field(s, "generation"))
-    df["description"] = df["species"].apply(lambda s: extract_species_field(s, "description"))
-
-    # Seleccionamos columnas útiles
-    cols = [
-        "id", "name", "species_name", "type_names", "ability_names",
-        "hp", "attack", "defense", "special-attack", "special-defense", "speed",
-        "height", "weight", "generation", "description"
-    ]
-    df_final = df[cols]
-
-    out_path = Path(input_path).with_name("pokedex_flatten.csv")
-    df_final.to_csv(out_path, index=False)
     print(f"✅ Archivo aplanado guardado en: {out_path}")
-    print(f"📊 Total de registros: {len(df_final)}")
-    print(f"📈 Columnas finales: {list(df_final.columns)}")
+    print(f"📊 Total de registros: {writer.rows}")
+    print(f"📈 Columnas finales: {FLAT_SCHEMA.names}")
 
-    return df_final
+    return writer.rows
 
 if __name__ == "__main__":
     flatten_pokedex()
@@ -3,6 +3,8 @@ import os
 from openai import OpenAI
 from dotenv import load_dotenv, find_dotenv
 
+from tracing import span
+
 load_dotenv(find_dotenv())
 API_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -11,9 +13,15 @@ if not API_KEY:
 
 client = OpenAI(api_key=API_KEY)
 
-def generate_answer(user_query: str, semantic_results=None, factual_docs=None, graph_relations=None, model="gpt-4o-mini"):
-    """Generate a final answer using multi-source context."""
+def build_messages(user_query: str, semantic_results=None, factual_docs=None, graph_relations=None):
+    """Assemble the chat messages from multi-source context."""
+    with span("llm.prompt_assembly") as s:
+        messages = _build_messages(user_query, semantic_results, factual_docs, graph_relations)
+        s.set(prompt_chars=sum(len(m["content"]) for m in messages))
+        return messages
 
+
+def _build_messages(user_query, semantic_results, factual_docs, graph_relations):
     # Convert contexts into readable snippets
     def join_snippets(items, key="text", n=3):
         if not items:
@@ -38,13 +46,69 @@ Respond clearly and in a friendly explanatory tone.
 If some parts of the answer are uncertain, say so briefly.
 """
 
-    response = client.chat.completions.create(
+    return [
+        {"role": "system", "content": "You are a knowledgeable Pokémon assistant."},
+        {"role": "user", "content": context_text},
+    ]
+
+
+def generate_answer(user_query: str, semantic_results=None, factual_docs=None, graph_relations=None, model="gpt-4o-mini"):
+    """Generate a final answer using multi-source context."""
+    messages = build_messages(user_query, semantic_results, factual_docs, graph_relations)
+    with span("llm.generate", model=model) as s:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.4,
+        )
+        if response.usage:
+            s.set(prompt_tokens=response.usage.prompt_tokens, completion_tokens=response.usage.completion_tokens)
+
+    return response.choices[0].message.content.strip()
+
+
+def generate_answer_stream(user_query: str, semantic_results=None, factual_docs=None, graph_relations=None, model="gpt-4o-mini"):
+    """Same as generate_answer, but yields text deltas as the model produces them."""
+    messages = build_messages(user_query, semantic_results, factual_docs, graph_relations)
+    # activate=False: the caller runs between yields and must not nest under this span
+    with span("llm.generate_stream", activate=False, model=model) as s:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.4,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+        for chunk in stream:
+            if chunk.usage:
+                s.set(prompt_tokens=chunk.usage.prompt_tokens, completion_tokens=chunk.usage.completion_tokens)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if "ttft_ms" not in s.attrs:
+                    s.set(ttft_ms=round(s.duration_sec * 1000, 1))
+                yield delta
+
+
+def generate_answer_from_context(context: dict, model="gpt-4o-mini"):
+    """Generate a final answer from a merged context built by retrieval_orchestrator."""
+    return generate_answer(
+        context["query"],
+        semantic_results=context.get("semantic"),
+        factual_docs=context.get("factual"),
+        graph_relations=context.get("graph"),
         model=model,
-        messages=[
-            {"role": "system", "content": "You are a knowledgeable Pokémon assistant."},
-            {"role": "user", "content": context_text},
-        ],
-        temperature=0.4,
     )
 
-    return response.choices[0].message.content.strip()
+
+def generate_answer_stream_from_context(context: dict, model="gpt-4o-mini"):
+    """Streaming variant of generate_answer_from_context."""
+    return generate_answer_stream(
+        context["query"],
+        semantic_results=context.get("semantic"),
+        factual_docs=context.get("factual"),
+        graph_relations=context.get("graph"),
+        model=model,
+    )
@@ -2,14 +2,20 @@
 graph_query.py
 ──────────────────────────────────────────────
 Handles relational queries using Neo4j + Cypher.
+All relational intents of a request are compiled into one parameterized
+UNWIND statement and executed in a single read transaction.
 ──────────────────────────────────────────────
 """
 
 import os
+import asyncio
+import threading
 from dotenv import load_dotenv, find_dotenv
-from neo4j import GraphDatabase, basic_auth
+from neo4j import AsyncGraphDatabase, GraphDatabase, basic_auth
 from typing import Dict, List, Any
 
+from tracing import span
+
 # ───────────────────────────────────────────────
 # CONFIG
 # ───────────────────────────────────────────────
@@ -18,74 +24,198 @@ load_dotenv(find_dotenv())
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "supersecure123")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "5.0"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "10.0"))
 
 # ───────────────────────────────────────────────
-# CONNECTION
+# CONNECTION (lazy, shared per process)
 # ───────────────────────────────────────────────
-driver = GraphDatabase.driver(NEO4J_URI, auth=basic_auth(NEO4J_USER, NEO4J_PASSWORD))
+_driver = None
+_async_driver = None
+_driver_lock = threading.Lock()
+
+
+def _driver_config() -> Dict[str, Any]:
+    return {
+        "auth": basic_auth(NEO4J_USER, NEO4J_PASSWORD),
+        "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+        "connection_timeout": NEO4J_CONNECTION_TIMEOUT,
+        "connection_acquisition_timeout": NEO4J_ACQUISITION_TIMEOUT,
+    }
+
+
+def get_driver():
+    """Process-wide sync driver with a configurable connection pool."""
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                _driver = GraphDatabase.driver(NEO4J_URI, **_driver_config())
+    return _driver
+
+
+def get_async_driver():
+    """Process-wide async driver (use from a single event loop)."""
+    global _async_driver
+    if _async_driver is None:
+        with _driver_lock:
+            if _async_driver is None:
+                _async_driver = AsyncGraphDatabase.driver(NEO4J_URI, **_driver_config())
+    return _async_driver
+
 
 # ───────────────────────────────────────────────
-# QUERY HANDLER
+# BATCHED QUERY
 # ───────────────────────────────────────────────
-def query_relational(intent: Dict[str, Any]) -> List[Dict[str, Any]]:
+# Relations advertised by the IntentRouter schema that the graph can answer.
+# strong_against / weak_against accept a Type, or a Pokémon (resolved through its types).
+SUPPORTED_RELATIONS = ["evolves_to", "evolves_from", "strong_against", "weak_against", "ability", "type"]
+
+BATCH_CYPHER = """
+UNWIND $requests AS r
+CALL {
+    WITH r
+    WITH r WHERE r.relation = 'evolves_to'
+    MATCH (:Pokemon {name: r.entity})-[:EVOLVES_TO]->(t:Pokemon)
+    RETURN t.name AS target
+  UNION
+    WITH r
+    WITH r WHERE r.relation = 'evolves_from'
+    MATCH (t:Pokemon)-[:EVOLVES_TO]->(:Pokemon {name: r.entity})
+    RETURN t.name AS target
+  UNION
+    WITH r
+    WITH r WHERE r.relation = 'type'
+    MATCH (:Pokemon {name: r.entity})-[:HAS_TYPE]->(t:Type)
+    RETURN t.name AS target
+  UNION
+    WITH r
+    WITH r WHERE r.relation = 'ability'
+    MATCH (:Pokemon {name: r.entity})-[:CAN_HAVE]->(a:Ability)
+    RETURN a.name AS target
+  UNION
+    WITH r
+    WITH r WHERE r.relation = 'strong_against'
+    OPTIONAL MATCH (:Pokemon {name: r.entity})-[:HAS_TYPE]->(pt:Type)
+    WITH r, collect(pt.name) + [r.entity] AS sources
+    MATCH (s:Type)-[:STRONG_AGAINST]->(t:Type)
+    WHERE s.name IN sources
+    RETURN t.name AS target
+  UNION
+    WITH r
+    WITH r WHERE r.relation = 'weak_against'
+    OPTIONAL MATCH (:Pokemon {name: r.entity})-[:HAS_TYPE]->(pt:Type)
+    WITH r, collect(pt.name) + [r.entity] AS sources
+    MATCH (s:Type)-[:WEAK_AGAINST]->(t:Type)
+    WHERE s.name IN sources
+    RETURN t.name AS target
+}
+RETURN r.entity AS entity, r.relation AS relation, collect(DISTINCT target) AS targets
+"""
+
+
+def graph_name(entity: str) -> str:
+    """Graph node names follow PokéAPI: lowercase, hyphen-separated ('Mr Mime' → 'mr-mime')."""
+    return "-".join(entity.strip().lower().split())
+
+
+def build_requests(intents: List[Dict[str, Any]]) -> tuple[List[Dict[str, str]], Dict[str, str]]:
     """
-    Executes a relational query on Neo4j based on the provided intent.
-    Supports: evolves_to, strong_against, weak_against.
+    Compile intents into UNWIND rows.
+    Returns (requests, display) where display maps graph names back to the entity as asked.
     """
-    entity = intent.get("entity")
-    attributes = intent.get("attributes", [])
-    results = []
-
-    if not entity or not attributes:
-        return results
-
-    for attr in attributes:
-        if attr == "evolves_to":
-            cypher = """
-            MATCH (p:Pokemon {name: $entity})-[:EVOLVES_TO]->(e:Pokemon)
-            RETURN e.name AS target
-            """
-        elif attr == "strong_against":
-            cypher = """
-            MATCH (a:Type {name: $entity})-[:STRONG_AGAINST]->(b:Type)
-            RETURN b.name AS target
-            """
-        elif attr == "weak_against":
-            cypher = """
-            MATCH (a:Type {name: $entity})-[:WEAK_AGAINST]->(b:Type)
-            RETURN b.name AS target
-            """
-        else:
+    requests, display, seen = [], {}, set()
+    for intent in intents:
+        entity = intent.get("entity")
+        if not entity:
             continue
+        name = graph_name(entity)
+        display.setdefault(name, entity)
+        for attr in intent.get("attributes", []):
+            if attr in SUPPORTED_RELATIONS and (name, attr) not in seen:
+                seen.add((name, attr))
+                requests.append({"entity": name, "relation": attr})
+    return requests, display
+
+
+def _format(records, display: Dict[str, str]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "entity": display.get(rec["entity"], rec["entity"]),
+            "relation": rec["relation"],
+            "targets": rec["targets"],
+            "source": "neo4j",
+        }
+        for rec in records
+        if rec["targets"]
+    ]
 
+
+def query_relational_many(intents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Resolve every relational intent of a request in one round-trip (single read transaction)."""
+    requests, display = build_requests(intents)
+    if not requests:
+        return []
+
+    def _run(tx):
+        return [record.data() for record in tx.run(BATCH_CYPHER, requests=requests)]
+
+    with span("neo4j.query_relational", requests=len(requests)) as s:
         try:
-            with driver.session() as session:
-                query_result = session.run(cypher, {"entity": entity})
-                targets = [record["target"] for record in query_result]
-
-                if targets:
-                    results.append({
-                        "entity": entity,
-                        "relation": attr,
-                        "targets": targets,
-                        "source": "neo4j"
-                    })
+            with get_driver().session(database=NEO4J_DATABASE) as session:
+                records = session.execute_read(_run)
+        except Exception as e:
+            print(f"⚠️ Neo4j batched query failed ({len(requests)} requests): {e}")
+            s.set(error=str(e))
+            return []
+        s.set(rows=len(records))
+
+    return _format(records, display)
 
+
+async def query_relational_many_async(intents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Async-driver variant of query_relational_many."""
+    requests, display = build_requests(intents)
+    if not requests:
+        return []
+
+    async def _run(tx):
+        result = await tx.run(BATCH_CYPHER, requests=requests)
+        return [record.data() async for record in result]
+
+    with span("neo4j.query_relational_async", requests=len(requests)) as s:
+        try:
+            async with get_async_driver().session(database=NEO4J_DATABASE) as session:
+                records = await session.execute_read(_run)
         except Exception as e:
-            print(f"⚠️ Neo4j query failed for {entity} ({attr}): {e}")
-            continue
+            print(f"⚠️ Neo4j async batched query failed ({len(requests)} requests): {e}")
+            s.set(error=str(e))
+            return []
+        s.set(rows=len(records))
 
-    return results
+    return _format(records, display)
+
+
+# ───────────────────────────────────────────────
+# QUERY HANDLER
+# ───────────────────────────────────────────────
+def query_relational(intent: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Executes a relational query on Neo4j based on the provided intent.
+    Supports: evolves_to, evolves_from, strong_against, weak_against, ability, type.
+    """
+    return query_relational_many([intent])
 
 
 # ───────────────────────────────────────────────
 # TEST
 # ───────────────────────────────────────────────
 if __name__ == "__main__":
-    test_intent = {
-        "type": "relational",
-        "entity": "Eevee",
-        "attributes": ["evolves_to"],
-    }
-    output = query_relational(test_intent)
-    print(output)
+    test_intents = [
+        {"type": "relational", "entity": "Eevee", "attributes": ["evolves_to"]},
+        {"type": "relational", "entity": "Vaporeon", "attributes": ["evolves_from", "weak_against"]},
+    ]
+    print(query_relational_many(test_intents))
+    print(asyncio.run(query_relational_many_async(test_intents)))
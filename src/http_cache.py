@@ -0,0 +1,258 @@
+"""
+http_cache.py
+──────────────────────────────────────────────
+Caché HTTP local (SQLite) para ingesta y scraping.
+- Cuerpos direccionados por contenido (sha256, comprimidos con zlib)
+- Frescura por max-age (Cache-Control o HTTP_CACHE_MAX_AGE)
+- Revalidación con ETag / Last-Modified (If-None-Match / If-Modified-Since → 304)
+- Modo offline ("cache-only"): nunca toca la red
+
+Modos (HTTP_CACHE_MODE):
+    default  → sirve lo fresco, revalida lo vencido
+    refresh  → revalida siempre (útil para refrescos parciales)
+    offline  → solo caché; un miss devuelve None
+    off      → desactivada
+
+Uso:
+    uv run python src/http_cache.py stats | gc | clear
+──────────────────────────────────────────────
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Mapping
+
+# ───────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "data/cache/http_cache.sqlite")
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "default").lower()
+HTTP_CACHE_MAX_AGE = float(os.getenv("HTTP_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+MODES = ("default", "refresh", "offline", "off")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    hash TEXT PRIMARY KEY,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL REFERENCES bodies(hash),
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    encoding TEXT,
+    fetched_at REAL NOT NULL,
+    max_age REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+    content_type: str | None
+    encoding: str | None
+    fetched_at: float
+    max_age: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    @property
+    def fresh(self) -> bool:
+        return self.age < self.max_age
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding or "utf-8", errors="replace")
+
+
+def parse_max_age(headers: Mapping[str, str], default: float) -> float:
+    """max-age de Cache-Control; no-store/no-cache → 0 (siempre revalidar)."""
+    cc = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cc or "no-cache" in cc:
+        return 0.0
+    m = re.search(r"max-age=(\d+)", cc)
+    return float(m.group(1)) if m else default
+
+
+# ───────────────────────────────────────────────
+# CACHE
+# ───────────────────────────────────────────────
+class HTTPCache:
+    def __init__(self, path: str = HTTP_CACHE_PATH, mode: str = HTTP_CACHE_MODE, default_max_age: float = HTTP_CACHE_MAX_AGE):
+        if mode not in MODES:
+            raise ValueError(f"HTTP_CACHE_MODE inválido: {mode!r} (usa {', '.join(MODES)})")
+        self.path = path
+        self.mode = mode
+        self.default_max_age = default_max_age
+        self.counters = {"hits": 0, "revalidated": 0, "stored": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        if mode != "off":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == "offline"
+
+    def lookup(self, url: str) -> CachedResponse | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT r.url, b.body, r.etag, r.last_modified, r.content_type, r.encoding, r.fetched_at, r.max_age "
+                "FROM responses r JOIN bodies b ON b.hash = r.hash WHERE r.url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        url, body, *rest = row
+        return CachedResponse(url, zlib.decompress(body), *rest)
+
+    def usable(self, entry: CachedResponse | None) -> bool:
+        """¿Se puede servir sin ir a la red?"""
+        if entry is None:
+            return False
+        if self.offline:
+            return True
+        return self.mode == "default" and entry.fresh
+
+    def _count(self, name: str):
+        # El cliente async llama al caché desde hilos (asyncio.to_thread)
+        with self._lock:
+            self.counters[name] += 1
+
+    def get_fresh(self, url: str) -> tuple[CachedResponse | None, bool]:
+        """
+        (entry, usable). Si usable, servir entry sin red; si no, usar
+        `conditional_headers(entry)` en el request y luego `store` / `revalidated`.
+        En modo offline un miss devuelve (None, False) y no debe tocarse la red.
+        """
+        entry = self.lookup(url)
+        if self.usable(entry):
+            self._count("hits")
+            return entry, True
+        if self.offline:
+            self._count("misses")
+        return entry, False
+
+    @staticmethod
+    def conditional_headers(entry: CachedResponse | None) -> dict:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url: str, body: bytes, headers: Mapping[str, str], encoding: str | None = None):
+        if not self.enabled:
+            return
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO bodies (hash, body) VALUES (?, ?)",
+                (digest, zlib.compress(body)),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    digest,
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    headers.get("Content-Type"),
+                    encoding,
+                    time.time(),
+                    parse_max_age(headers, self.default_max_age),
+                ),
+            )
+            self.counters["stored"] += 1
+
+    def revalidated(self, url: str, headers: Mapping[str, str]):
+        """Respuesta 304: el cuerpo guardado sigue vigente; renovar frescura y validadores."""
+        if not self.enabled:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ?, max_age = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (
+                    time.time(),
+                    parse_max_age(headers, self.default_max_age),
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    url,
+                ),
+            )
+            self.counters["revalidated"] += 1
+
+    def gc(self) -> int:
+        """Borra cuerpos que ya no referencia ninguna URL."""
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM bodies WHERE hash NOT IN (SELECT hash FROM responses)")
+        return cur.rowcount
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("DELETE FROM bodies")
+
+    def stats(self) -> dict:
+        with self._lock:
+            info = {"path": self.path, "mode": self.mode, **self.counters}
+        if self.enabled:
+            with self._lock:
+                info["urls"] = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                info["bodies"] = self._conn.execute("SELECT COUNT(*) FROM bodies").fetchone()[0]
+        return info
+
+
+_cache: HTTPCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> HTTPCache:
+    """Caché compartida por proceso (configurada por variables de entorno)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HTTPCache()
+    return _cache
+
+
+# ───────────────────────────────────────────────
+# MANTENIMIENTO
+# ───────────────────────────────────────────────
+if __name__ == "__main__":
+    cache = HTTPCache(mode="default")
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "gc":
+        print(f"🧹 {cache.gc()} cuerpos huérfanos eliminados.")
+    elif command == "clear":
+        cache.clear()
+        print(f"🗑️  Caché HTTP vaciada ({cache.path}).")
+    print(cache.stats())
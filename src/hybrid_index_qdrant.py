@@ -1,22 +1,41 @@
 import os
 import json
 import glob
+import hashlib
+import time
 import uuid
+import argparse
+from functools import lru_cache
+from itertools import chain, islice
 from tqdm import tqdm
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 
+from chunk_ids import with_ids
+from embedding_service import load_models
+from embedding_store import EmbeddingStore
+from qdrant_profiles import get_profile
+
 # ───────────────────────────────────────────────
 # CONFIG
 # ───────────────────────────────────────────────
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "pokedex-key")
+# Collection name or alias; searches always go through this name
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "pokedex_hybrid")
 CHUNKS_DIR = os.getenv("CHUNKS_DIR", "data/chunks")
+DENSE_MODEL = "jinaai/jina-embeddings-v2-small-en"
+DENSE_DIM = 512
+SPARSE_MODEL = "Qdrant/bm25"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+UPLOAD_BATCH_SIZE = int(os.getenv("QDRANT_UPLOAD_BATCH_SIZE", "256"))
+UPLOAD_PARALLEL = int(os.getenv("QDRANT_UPLOAD_PARALLEL", "1"))
+UPLOAD_MAX_RETRIES = int(os.getenv("QDRANT_UPLOAD_MAX_RETRIES", "3"))
+SCROLL_PAGE_SIZE = 1000
 
 
 # ───────────────────────────────────────────────
-# LOAD CHUNKS
+# LOAD CHUNKS (lazy)
 # ───────────────────────────────────────────────
 def read_jsonl(path):
     with open(path, "r", encoding="utf-8") as f:
@@ -24,95 +43,301 @@ def read_jsonl(path):
             if line.strip():
                 yield json.loads(line)
 
-def load_all_chunks(base_dir):
-    files = glob.glob(os.path.join(base_dir, "*.jsonl"))
-    records = []
-    for fp in files:
-        records.extend(list(read_jsonl(fp)))
-    return records
+def iter_chunks(base_dir):
+    """
+    Yields chunk records one at a time. IDs are recomputed from content, so
+    chunk files written before deterministic IDs still diff correctly.
+    """
+    for fp in sorted(glob.glob(os.path.join(base_dir, "*.jsonl"))):
+        for rec in read_jsonl(fp):
+            yield with_ids(rec)
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
 
 
 # ───────────────────────────────────────────────
-# MAIN
+# COLLECTION / ALIAS HELPERS
 # ───────────────────────────────────────────────
-def main():
-    print("🚀 Starting hybrid indexing (dense + sparse, official syntax)...")
+def resolve_collection(client, name):
+    """Returns (physical collection or None, is_alias) for a collection name or alias."""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name, True
+    if client.collection_exists(name):
+        return name, False
+    return None, False
 
-    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-    records = load_all_chunks(CHUNKS_DIR)
-    if not records:
-        raise RuntimeError("❌ No records found in data/chunks/")
+def create_collection(client, name, profile=None):
+    """Dense 'jina-small' + sparse 'bm25' subspaces, laid out per the storage profile."""
+    profile = profile or get_profile()
+    print(f"🧱 Creating collection '{name}' (profile '{profile.name}')...")
+    client.create_collection(collection_name=name, **profile.collection_config(DENSE_DIM))
 
+def existing_hashes(client, collection):
+    """{point_id: (text_hash, payload_hash)} for every point already indexed (payload only, no vectors)."""
+    hashes = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=["text_hash", "payload_hash"],
+            with_vectors=False,
+        )
+        for p in points:
+            payload = p.payload or {}
+            hashes[str(p.id)] = (payload.get("text_hash"), payload.get("payload_hash"))
+        if offset is None:
+            return hashes
 
-    # ───────────────────────────────────────────────
-    # RESET COLLECTION (opcional)
-    # ───────────────────────────────────────────────
-    if COLLECTION_NAME in [c.name for c in client.get_collections().collections]:
-        print(f"🗑️  Deleting existing collection '{COLLECTION_NAME}'...")
-        client.delete_collection(collection_name=COLLECTION_NAME)
 
+class SyncPlan:
+    """
+    Streams chunk records and yields only the ones that need embedding.
+    Only IDs are kept in memory, plus the new payload of chunks whose text is
+    unchanged but whose metadata moved (chunk_index, section_name...);
+    `unchanged`, `payload_updates` and `stale` are complete once the stream
+    has been consumed.
+    """
 
+    def __init__(self, existing):
+        self.existing = existing
+        self.seen = set()
+        self.unchanged = []
+        self.payload_updates = {}
+        self.changed = 0
+        self.first_text = None
 
-    # ───────────────────────────────────────────────
-    # CREATE COLLECTION (multi-vector, hybrid)
-    # ───────────────────────────────────────────────
-    collections = [c.name for c in client.get_collections().collections]
-
-    if COLLECTION_NAME not in collections:
-        print(f"🧱 Creating collection '{COLLECTION_NAME}'...")
-        client.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config={
-                # Dense vector subspace for Jina embeddings
-                "jina-small": models.VectorParams(
-                    size=512,
-                    distance=models.Distance.COSINE,
-                ),
-            },
-            sparse_vectors_config={
-                # Sparse subspace for BM25
-                "bm25": models.SparseVectorParams(
-                    modifier=models.Modifier.IDF,
-                ),
-            },
-        )
+    def pending(self, records):
+        for rec in records:
+            cid = rec["chunk_id"]
+            if cid in self.seen:
+                continue
+            self.seen.add(cid)
+            if self.first_text is None:
+                self.first_text = rec["text"]
+            text_hash, payload_hash = self.existing.get(cid, (None, None))
+            if text_hash == rec["text_hash"]:
+                self.unchanged.append(cid)
+                payload = payload_for(rec)
+                if payload_hash != payload["payload_hash"]:
+                    self.payload_updates[cid] = payload
+                continue
+            self.changed += 1
+            yield rec
 
-    # ───────────────────────────────────────────────
-    # UPSERT DOCUMENTS
-    # ───────────────────────────────────────────────
-    points = []
-    for rec in tqdm(records, desc="Indexing chunks"):
-        text = rec["text"]
-        points.append(
-            models.PointStruct(
+    @property
+    def stale(self):
+        if not self.seen:
+            # Never treat an empty/missing chunks dir as "everything was removed"
+            raise RuntimeError("❌ No records found in data/chunks/")
+        return [pid for pid in self.existing if pid not in self.seen]
+
+
+# ───────────────────────────────────────────────
+# EMBEDDING + POINTS
+# ───────────────────────────────────────────────
+@lru_cache(maxsize=1)
+def get_embedders():
+    # Same local model dir as the query service; batch indexing gets every core
+    return load_models(threads=None)
+
+def payload_for(rec):
+    payload = {
+        "chunk_id": rec["chunk_id"],
+        "text_hash": rec["text_hash"],
+        "document_name": rec["document_name"],
+        "section_name": rec.get("section_name"),
+        "chunk_index": rec.get("chunk_index"),
+        "text": rec["text"][:512],
+    }
+    # Detects metadata-only edits (same text, new chunk_index / section_name...)
+    material = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    payload["payload_hash"] = hashlib.sha256(material.encode("utf-8")).hexdigest()
+    return payload
+
+def embed_batch(batch, store=None, counts=None):
+    """
+    Returns ({text_hash: dense}, {text_hash: (indices, values)}) for a batch.
+    Vectors already in the embedding store are reused; only misses hit the models.
+    """
+    hashes = [rec["text_hash"] for rec in batch]
+    dense, sparse = {}, {}
+    if store:
+        dense = store.dense(DENSE_MODEL, DENSE_DIM).get_many(hashes)
+        sparse = store.sparse(SPARSE_MODEL).get_many(hashes)
+
+    missing = {rec["text_hash"]: rec["text"] for rec in batch
+               if rec["text_hash"] not in dense or rec["text_hash"] not in sparse}
+    if missing:
+        dense_model, sparse_model = get_embedders()
+        texts = list(missing.values())
+        new_dense = dict(zip(missing, dense_model.embed(texts, batch_size=len(texts))))
+        new_sparse = {h: (sv.indices, sv.values)
+                      for h, sv in zip(missing, sparse_model.embed(texts, batch_size=len(texts)))}
+        if store:
+            store.dense(DENSE_MODEL, DENSE_DIM).put_many(new_dense.items())
+            store.sparse(SPARSE_MODEL).put_many(new_sparse.items())
+        dense.update(new_dense)
+        sparse.update(new_sparse)
+
+    if counts is not None:
+        counts["embedded"] += len(missing)
+        counts["reused"] += len(set(hashes)) - len(missing)
+    return dense, sparse
+
+def embed_points(records, batch_size=EMBED_BATCH_SIZE, store=None, counts=None):
+    """Embeds records in batches (dense + BM25) and yields ready-to-upload points."""
+    for batch in batched(records, batch_size):
+        dense, sparse = embed_batch(batch, store, counts)
+        for rec in batch:
+            h = rec["text_hash"]
+            indices, values = sparse[h]
+            yield models.PointStruct(
                 id=rec["chunk_id"],
                 vector={
-                    "jina-small": models.Document(
-                        text=text,
-                        model="jinaai/jina-embeddings-v2-small-en",
-                    ),
-                    "bm25": models.Document(
-                        text=text,
-                        model="Qdrant/bm25",
-                    ),
-                },
-                payload={
-                    "chunk_id": rec["chunk_id"],
-                    "document_name": rec["document_name"],
-                    "section_name": rec.get("section_name"),
-                    "chunk_index": rec.get("chunk_index"),
-                    "text": text[:512],
+                    "jina-small": dense[h].tolist(),
+                    "bm25": models.SparseVector(indices=indices.tolist(), values=values.tolist()),
                 },
+                payload=payload_for(rec),
             )
+
+def upload(client, collection, points, desc, total=None):
+    """Streams points through upload_points (batched, parallel, retried) with a points/s readout."""
+    started = time.perf_counter()
+    progress = tqdm(points, desc=desc, total=total, unit="pt")
+    client.upload_points(
+        collection_name=collection,
+        points=progress,
+        batch_size=UPLOAD_BATCH_SIZE,
+        parallel=UPLOAD_PARALLEL,
+        max_retries=UPLOAD_MAX_RETRIES,
+        wait=True,
+    )
+    progress.close()
+    elapsed = time.perf_counter() - started
+    if progress.n:
+        print(f"📤 {progress.n} points in {elapsed:.1f}s — {progress.n / elapsed:,.0f} points/s")
+    return progress.n
+
+def iter_copied_points(client, source, ids, payload_updates=None):
+    """Streams unchanged points (vectors + payload) out of the live collection."""
+    payload_updates = payload_updates or {}
+    for batch in batched(ids, UPLOAD_BATCH_SIZE):
+        for p in client.retrieve(collection_name=source, ids=batch, with_payload=True, with_vectors=True):
+            payload = payload_updates.get(str(p.id), p.payload)
+            yield models.PointStruct(id=p.id, vector=p.vector, payload=payload)
+
+def update_payloads(client, collection, payload_updates):
+    """Rewrites the payload of unchanged-text points in place (no re-embedding)."""
+    for batch in batched(payload_updates.items(), UPLOAD_BATCH_SIZE):
+        client.batch_update_points(
+            collection_name=collection,
+            update_operations=[
+                models.SetPayloadOperation(set_payload=models.SetPayload(payload=payload, points=[cid]))
+                for cid, payload in batch
+            ],
         )
 
-    client.upsert(collection_name=COLLECTION_NAME, points=points)
-    print(f"✅ Indexed {len(points)} chunks into '{COLLECTION_NAME}' collection.")
+
+# ───────────────────────────────────────────────
+# SYNC MODES
+# ───────────────────────────────────────────────
+def sync_in_place(client, collection, records, store=None, counts=None):
+    """Upserts new/changed chunks and deletes removed ones; the collection stays online."""
+    plan = SyncPlan(existing_hashes(client, collection))
+    upload(client, collection, embed_points(plan.pending(records), store=store, counts=counts), "Indexing chunks")
+
+    stale = plan.stale
+    if plan.payload_updates:
+        update_payloads(client, collection, plan.payload_updates)
+    if stale:
+        client.delete(collection_name=collection, points_selector=models.PointIdsList(points=stale))
+    print(f"🧮 {plan.changed} new/changed, {len(plan.unchanged)} unchanged "
+          f"({len(plan.payload_updates)} payload-only updates), {len(stale)} removed.")
+    return plan, {"upserted": plan.changed, "unchanged": len(plan.unchanged),
+                  "payload_updated": len(plan.payload_updates), "deleted": len(stale)}
+
+def build_shadow(client, alias, live, records, keep_old=False, store=None, counts=None, profile=None):
+    """
+    Builds a fresh '<alias>__<timestamp>_<id>' collection and atomically points
+    the alias at it. Unchanged chunks are copied from the live collection; a
+    failed build deletes the shadow instead of leaving it orphaned.
+    """
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        raise RuntimeError("❌ No records found in data/chunks/")
+    records = chain([first], records)
+
+    shadow = f"{alias}__{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    create_collection(client, shadow, profile)
+    try:
+        plan = SyncPlan(existing_hashes(client, live) if live else {})
+        upload(client, shadow, embed_points(plan.pending(records), store=store, counts=counts), "Indexing chunks")
+        stale = plan.stale
+        if plan.unchanged:
+            upload(client, shadow, iter_copied_points(client, live, plan.unchanged, plan.payload_updates),
+                   "Copying unchanged chunks", total=len(plan.unchanged))
+    except BaseException:
+        print(f"🗑️  Build failed, deleting shadow collection '{shadow}'...")
+        client.delete_collection(collection_name=shadow)
+        raise
+    print(f"🧮 {plan.changed} embedded, {len(plan.unchanged)} copied, {len(stale)} dropped.")
+
+    if live == alias:
+        # A real collection owns the alias name: it has to go before the alias can exist
+        print(f"⚠️  Replacing physical collection '{alias}' with an alias (one-time migration).")
+        client.delete_collection(collection_name=alias)
+        live = None
+
+    operations = []
+    if live:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    operations.append(
+        models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=shadow, alias_name=alias))
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+    print(f"🔀 Alias '{alias}' → '{shadow}'.")
+
+    if live and not keep_old:
+        print(f"🗑️  Deleting previous collection '{live}'...")
+        client.delete_collection(collection_name=live)
+    return plan, {"upserted": plan.changed, "copied": len(plan.unchanged), "deleted": len(stale), "collection": shadow}
+
+
+# ───────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────
+def main(shadow=False, keep_old=False, use_store=True, profile=None):
+    print("🚀 Starting hybrid indexing (streaming dense + sparse upload)...")
+
+    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    store = EmbeddingStore() if use_store else None
+    counts = {"embedded": 0, "reused": 0}
+    records = iter_chunks(CHUNKS_DIR)
+    live, is_alias = resolve_collection(client, COLLECTION_NAME)
+
+    if shadow:
+        plan, stats = build_shadow(client, COLLECTION_NAME, live, records, keep_old=keep_old,
+                                   store=store, counts=counts, profile=profile)
+    else:
+        if live is None:
+            create_collection(client, COLLECTION_NAME, profile)
+            live = COLLECTION_NAME
+        plan, stats = sync_in_place(client, live, records, store=store, counts=counts)
+
+    print(f"✅ Synced {len(plan.seen)} chunks into '{COLLECTION_NAME}' — {stats}")
+    print(f"🧠 Embeddings: {counts['embedded']} computed, {counts['reused']} reused from the local store.")
 
     # ───────────────────────────────────────────────
     # QUICK VALIDATION
     # ───────────────────────────────────────────────
-    sample_query = records[0]["text"][:200]
+    sample_query = plan.first_text[:200]
     print("\n🔎 Running hybrid validation query...")
 
     results = client.query_points(
@@ -121,7 +346,7 @@ def main():
             models.Prefetch(
                 query=models.Document(
                     text=sample_query,
-                    model="jinaai/jina-embeddings-v2-small-en",
+                    model=DENSE_MODEL,
                 ),
                 using="jina-small",
                 limit=10,
@@ -129,7 +354,7 @@ def main():
             models.Prefetch(
                 query=models.Document(
                     text=sample_query,
-                    model="Qdrant/bm25",
+                    model=SPARSE_MODEL,
                 ),
                 using="bm25",
                 limit=10,
@@ -149,4 +374,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Incremental hybrid indexing into Qdrant")
+    parser.add_argument("--shadow", action="store_true",
+                        help="build a new collection and switch the alias to it")
+    parser.add_argument("--keep-old", action="store_true",
+                        help="(--shadow) keep the previous collection after the switch")
+    parser.add_argument("--no-store", action="store_true",
+                        help="skip the local embedding store (always run the models)")
+    parser.add_argument("--profile", default=None,
+                        help="storage profile for new collections (default: QDRANT_PROFILE); use with --shadow to re-layout")
+    args = parser.parse_args()
+    main(shadow=args.shadow, keep_old=args.keep_old, use_store=not args.no_store,
+         profile=get_profile(args.profile))
@@ -6,49 +6,94 @@ Hybrid (dense + sparse) semantic search for Pokémon RAG system.
 """
 
 import os
+import time
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
 
+from embedding_service import QueryVectors, get_embedding_service
+from qdrant_profiles import get_profile, profile_for_collection
+from tracing import span
+
 # ───────────────────────────────────────────────
 # CONFIG
 # ───────────────────────────────────────────────
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "pokedex-key")
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "pokedex_hybrid")
+# How often the dense search params are re-read from the collection (alias swaps)
+SEARCH_PARAMS_TTL_SEC = float(os.getenv("SEARCH_PARAMS_TTL_SEC", "300"))
+
+_search_params: dict = {}   # collection → (params, fetched_at)
+
+def dense_search_params(client) -> qmodels.SearchParams:
+    """
+    hnsw_ef / quantization rescoring for the dense prefetch, derived from the
+    collection's own config and cached for SEARCH_PARAMS_TTL_SEC.
+    Falls back to QDRANT_PROFILE when the collection can't be inspected.
+    """
+    cached = _search_params.get(COLLECTION_NAME)
+    if cached and time.monotonic() - cached[1] < SEARCH_PARAMS_TTL_SEC:
+        return cached[0]
+    try:
+        profile = profile_for_collection(client.get_collection(COLLECTION_NAME))
+    except Exception as e:
+        print(f"⚠️ Could not read '{COLLECTION_NAME}' config, using QDRANT_PROFILE search params: {e}")
+        profile = get_profile()
+    params = profile.search_params()
+    _search_params[COLLECTION_NAME] = (params, time.monotonic())
+    return params
 
 # ───────────────────────────────────────────────
 # HYBRID SEARCH (RRF)
 # ───────────────────────────────────────────────
-def hybrid_rrf_search(client, query: str, limit: int = 5):
+def query_inputs(query: str, vectors: QueryVectors | None = None):
+    """
+    (dense, sparse) prefetch queries: precomputed vectors from the embedding
+    service when available, otherwise Documents embedded by the client.
+    """
+    if vectors is None and (service := get_embedding_service()) is not None:
+        try:
+            vectors = service.embed_query(query)
+        except Exception as e:
+            print(f"⚠️ Query embedding failed, using Document fallback: {e}")
+    if vectors is not None:
+        return vectors.dense, vectors.sparse
+    return (
+        qmodels.Document(text=query, model="jinaai/jina-embeddings-v2-small-en"),
+        qmodels.Document(text=query, model="Qdrant/bm25"),
+    )
+
+def hybrid_rrf_search(client, query: str, limit: int = 5, vectors: QueryVectors | None = None):
     """
     Perform hybrid search (dense + sparse) using Reciprocal Rank Fusion (RRF).
     Returns only the final fused results.
     """
-    results = client.query_points(
-        collection_name=COLLECTION_NAME,
-        prefetch=[
-            qmodels.Prefetch(
-                query=qmodels.Document(
-                    text=query,
-                    model="jinaai/jina-embeddings-v2-small-en",
+    with span("qdrant.hybrid_search", limit=limit, query_chars=len(query)) as s:
+        dense, sparse = query_inputs(query, vectors)
+        results = client.query_points(
+            collection_name=COLLECTION_NAME,
+            prefetch=[
+                qmodels.Prefetch(
+                    query=dense,
+                    using="jina-small",
+                    params=dense_search_params(client),
+                    limit=5 * limit,
                 ),
-                using="jina-small",
-                limit=5 * limit,
-            ),
-            qmodels.Prefetch(
-                query=qmodels.Document(
-                    text=query,
-                    model="Qdrant/bm25",
+                qmodels.Prefetch(
+                    query=sparse,
+                    using="bm25",
+                    limit=5 * limit,
                 ),
-                using="bm25",
-                limit=5 * limit,
-            ),
-        ],
-        query=qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
-        limit=limit,
-        with_payload=True,
-    )
-    return results.points
+            ],
+            query=qmodels.FusionQuery(fusion=qmodels.Fusion.RRF),
+            limit=limit,
+            with_payload=True,
+        )
+        s.set(
+            points=len(results.points),
+            payload_chars=sum(len((p.payload or {}).get("text") or "") for p in results.points),
+        )
+        return results.points
 
 
 # ───────────────────────────────────────────────
@@ -0,0 +1,210 @@
+"""
+import_pokeapi_csv.py
+──────────────────────────────────────────────
+Ingesta offline desde el volcado CSV de la PokéAPI
+(https://github.com/PokeAPI/pokeapi/tree/master/data/v2/csv).
+
+Construye los mismos archivos que `consolidate_pokedex_batches.py`
+(pokedex_full, evolutions_full, type_relations_full) con joins
+vectorizados de pandas, sin un solo request HTTP.
+
+Uso:
+    uv run python src/import_pokeapi_csv.py [ruta/al/csv]   # default: data/pokeapi_csv
+──────────────────────────────────────────────
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from pokeapi_async import api_url
+from pokedex_io import EVOLUTIONS_SCHEMA, POKEDEX_SCHEMA, TYPE_RELATIONS_SCHEMA, output_path, write_table
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                          CONFIG                            ║
+# ╚════════════════════════════════════════════════════════════╝
+
+POKEAPI_CSV_DIR = os.getenv("POKEAPI_CSV_DIR", "data/pokeapi_csv")
+OUT_DIR = Path("data/structured/consolidated")
+
+ENGLISH_LANGUAGE_ID = 9
+SUPER_EFFECTIVE = 200  # type_efficacy.damage_factor (x2)
+
+REQUIRED_TABLES = [
+    "pokemon", "pokemon_types", "types", "pokemon_abilities", "abilities",
+    "pokemon_stats", "stats", "pokemon_species", "generations",
+    "pokemon_species_flavor_text", "type_efficacy",
+]
+
+
+def read_tables(csv_dir: str) -> dict[str, pd.DataFrame]:
+    base = Path(csv_dir)
+    missing = [t for t in REQUIRED_TABLES if not (base / f"{t}.csv").exists()]
+    if missing:
+        raise FileNotFoundError(f"❌ Faltan tablas en {base}: {', '.join(missing)}")
+    tables = {t: pd.read_csv(base / f"{t}.csv") for t in REQUIRED_TABLES}
+    print(f"📂 Leídas {len(tables)} tablas desde {base}")
+    return tables
+
+
+def _resource(kind: str, ids: pd.Series) -> list[str]:
+    return [api_url(f"{kind}/{i}/") for i in ids]
+
+
+def _nested_by_pokemon(df: pd.DataFrame, column: str) -> pd.Series:
+    """Agrupa los dicts ya construidos en listas por pokemon_id."""
+    return df.groupby("pokemon_id", sort=False)[column].agg(list)
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                    POKÉDEX (formato API)                   ║
+# ╚════════════════════════════════════════════════════════════╝
+
+def build_types(t: dict) -> pd.Series:
+    df = t["pokemon_types"].merge(
+        t["types"][["id", "identifier"]], left_on="type_id", right_on="id", how="left"
+    ).sort_values(["pokemon_id", "slot"])
+    df["entry"] = [
+        {"slot": int(slot), "type": {"name": name, "url": url}}
+        for slot, name, url in zip(df["slot"], df["identifier"], _resource("type", df["type_id"]))
+    ]
+    return _nested_by_pokemon(df, "entry")
+
+
+def build_abilities(t: dict) -> pd.Series:
+    df = t["pokemon_abilities"].merge(
+        t["abilities"][["id", "identifier"]], left_on="ability_id", right_on="id", how="left"
+    ).sort_values(["pokemon_id", "slot"])
+    df["entry"] = [
+        {"ability": {"name": name, "url": url}, "is_hidden": bool(hidden), "slot": int(slot)}
+        for name, url, hidden, slot in zip(
+            df["identifier"], _resource("ability", df["ability_id"]), df["is_hidden"], df["slot"]
+        )
+    ]
+    return _nested_by_pokemon(df, "entry")
+
+
+def build_stats(t: dict) -> pd.Series:
+    df = t["pokemon_stats"].merge(
+        t["stats"][["id", "identifier"]], left_on="stat_id", right_on="id", how="left"
+    ).sort_values(["pokemon_id", "stat_id"])
+    df["entry"] = [
+        {"base_stat": int(base), "effort": int(effort), "stat": {"name": name, "url": url}}
+        for base, effort, name, url in zip(
+            df["base_stat"], df["effort"], df["identifier"], _resource("stat", df["stat_id"])
+        )
+    ]
+    return _nested_by_pokemon(df, "entry")
+
+
+def build_species(t: dict) -> pd.DataFrame:
+    """species_id → {description, generation, evolution_chain_url} (igual que get_species_data)."""
+    species = t["pokemon_species"].merge(
+        t["generations"][["id", "identifier"]].rename(columns={"id": "generation_id", "identifier": "generation"}),
+        on="generation_id",
+        how="left",
+    )
+
+    # Primer flavor text en inglés (la API los devuelve ordenados por versión)
+    flavor = t["pokemon_species_flavor_text"]
+    flavor = (
+        flavor[flavor["language_id"] == ENGLISH_LANGUAGE_ID]
+        .sort_values(["species_id", "version_id"])
+        .drop_duplicates("species_id")
+    )
+    flavor = flavor.assign(
+        description=flavor["flavor_text"].str.replace("\n", " ", regex=False).str.replace("\f", " ", regex=False)
+    )[["species_id", "description"]]
+    species = species.merge(flavor, left_on="id", right_on="species_id", how="left")
+
+    chain_ids = species["evolution_chain_id"]
+    species["species"] = [
+        {
+            "description": desc if isinstance(desc, str) else None,
+            "generation": gen if isinstance(gen, str) else None,
+            "evolution_chain_url": api_url(f"evolution-chain/{int(cid)}/") if pd.notna(cid) else None,
+        }
+        for desc, gen, cid in zip(species["description"], species["generation"], chain_ids)
+    ]
+    return species[["id", "identifier", "species"]].rename(columns={"id": "species_id", "identifier": "species_name"})
+
+
+def build_pokedex(t: dict) -> pd.DataFrame:
+    """Mismas columnas que pokedex_full: id, name, species_name, types, abilities, stats, height, weight, species."""
+    pokemon = t["pokemon"][["id", "identifier", "species_id", "height", "weight"]].rename(columns={"identifier": "name"})
+    df = pokemon.merge(build_species(t), on="species_id", how="left")
+    df = df.join(build_types(t).rename("types"), on="id")
+    df = df.join(build_abilities(t).rename("abilities"), on="id")
+    df = df.join(build_stats(t).rename("stats"), on="id")
+
+    for col in ["types", "abilities", "stats"]:
+        df[col] = [v if isinstance(v, list) else [] for v in df[col]]
+
+    df = df.sort_values("id", ignore_index=True)
+    return df[["id", "name", "species_name", "types", "abilities", "stats", "height", "weight", "species"]]
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║               EVOLUCIONES Y RELACIONES DE TIPOS            ║
+# ╚════════════════════════════════════════════════════════════╝
+
+def build_evolutions(t: dict) -> pd.DataFrame:
+    """Pares (source, target) entre especies, como get_evolution_pairs."""
+    species = t["pokemon_species"][["id", "identifier", "evolves_from_species_id"]]
+    names = species.set_index("id")["identifier"]
+    evo = species.dropna(subset=["evolves_from_species_id"])
+    df = pd.DataFrame({
+        "source": evo["evolves_from_species_id"].astype(int).map(names).values,
+        "target": evo["identifier"].values,
+    })
+    return df.dropna().drop_duplicates().sort_values(["source", "target"], ignore_index=True)
+
+
+def build_type_relations(t: dict) -> pd.DataFrame:
+    """
+    type_efficacy (damage_factor = 200, tipo atacante → tipo objetivo):
+      STRONG_AGAINST: atacante → objetivo   (double_damage_to)
+      WEAK_AGAINST:   objetivo → atacante   (double_damage_from)
+    """
+    names = t["types"].set_index("id")["identifier"]
+    eff = t["type_efficacy"]
+    eff = eff[eff["damage_factor"] == SUPER_EFFECTIVE]
+    attacker = eff["damage_type_id"].map(names).values
+    target = eff["target_type_id"].map(names).values
+
+    strong = pd.DataFrame({"source": attacker, "relation": "STRONG_AGAINST", "target": target})
+    weak = pd.DataFrame({"source": target, "relation": "WEAK_AGAINST", "target": attacker})
+    df = pd.concat([strong, weak], ignore_index=True).dropna()
+    # Mismo orden que get_type_relations: por tipo, primero STRONG y luego WEAK
+    return df.sort_values(["source", "relation", "target"], ignore_index=True)
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                          MAIN                              ║
+# ╚════════════════════════════════════════════════════════════╝
+
+def import_dump(csv_dir: str = POKEAPI_CSV_DIR, out_dir: Path = OUT_DIR) -> dict[str, pd.DataFrame]:
+    tables = read_tables(csv_dir)
+    outputs = {
+        "pokedex_full": build_pokedex(tables),
+        "evolutions_full": build_evolutions(tables),
+        "type_relations_full": build_type_relations(tables),
+    }
+
+    schemas = {
+        "pokedex_full": POKEDEX_SCHEMA,
+        "evolutions_full": EVOLUTIONS_SCHEMA,
+        "type_relations_full": TYPE_RELATIONS_SCHEMA,
+    }
+    for name, df in outputs.items():
+        path = output_path(out_dir, name)
+        write_table(df, path, schemas[name])
+        print(f"✅ {path.name} → {len(df)} filas")
+    print(f"\n💾 Guardado en {out_dir}/ (Pokémon, evoluciones y tipos).")
+    return outputs
+
+
+if __name__ == "__main__":
+    import_dump(sys.argv[1] if len(sys.argv) > 1 else POKEAPI_CSV_DIR)
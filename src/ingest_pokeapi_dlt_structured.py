@@ -1,22 +1,47 @@
 import os
+import json
 import time
 import random
+import asyncio
 import requests
 import pandas as pd
-from tqdm import tqdm
 import dlt
 
+from http_cache import get_http_cache
+from pokedex_io import EVOLUTIONS_SCHEMA, POKEDEX_SCHEMA, output_path, write_table
+from pokeapi_async import (
+    api_url,
+    ingest_all,
+    fetch_type_relations,
+    parse_species,
+    parse_evolution_pairs,
+)
+
 
 # ╔════════════════════════════════════════════════════════════╗
 # ║                     HELPER FUNCTIONS                       ║
 # ╚════════════════════════════════════════════════════════════╝
 
 def safe_get_json(url: str, retries: int = 5, backoff_factor: float = 1.5):
-    """Request con reintentos y control de errores (maneja 429, 5xx, timeouts)."""
+    """Request con reintentos y control de errores (maneja 429, 5xx, timeouts).
+    Versión síncrona para llamadas sueltas; la ingesta masiva usa pokeapi_async."""
+    url = api_url(url)
+    cache = get_http_cache()
+    entry, usable = cache.get_fresh(url)
+    if usable:
+        return json.loads(entry.body)
+    if cache.offline:
+        print(f"📴 Sin caché para {url} (modo offline)")
+        return None
+
     for attempt in range(retries):
         try:
-            resp = requests.get(url, timeout=10)
+            resp = requests.get(url, timeout=10, headers=cache.conditional_headers(entry))
+            if resp.status_code == 304 and entry is not None:
+                cache.revalidated(url, resp.headers)
+                return json.loads(entry.body)
             if resp.status_code == 200:
+                cache.store(url, resp.content, resp.headers)
                 return resp.json()
             elif resp.status_code in (429, 500, 502, 503, 504):
                 wait = backoff_factor ** attempt + random.random()
@@ -37,24 +62,8 @@ def safe_get_json(url: str, retries: int = 5, backoff_factor: float = 1.5):
 def get_species_data(pokemon_id: int, species_url: str = None) -> dict:
     """Obtiene descripción, generación y URL de cadena evolutiva.
     Usa species_url como fallback para variantes con IDs especiales (>=10000)."""
-    url = species_url or f"https://pokeapi.co/api/v2/pokemon-species/{pokemon_id}/"
-    species = safe_get_json(url)
-    if not species:
-        return {"description": None, "generation": None, "evolution_chain_url": None}
-
-    description = next(
-        (
-            entry["flavor_text"].replace("\n", " ").replace("\f", " ")
-            for entry in species.get("flavor_text_entries", [])
-            if entry.get("language", {}).get("name") == "en"
-        ),
-        None,
-    )
-    return {
-        "description": description,
-        "generation": species.get("generation", {}).get("name"),
-        "evolution_chain_url": species.get("evolution_chain", {}).get("url"),
-    }
+    url = species_url or f"pokemon-species/{pokemon_id}/"
+    return parse_species(safe_get_json(url))
 
 
 def get_evolution_pairs(evo_url: str) -> list[tuple[str, str]]:
@@ -62,44 +71,12 @@ def get_evolution_pairs(evo_url: str) -> list[tuple[str, str]]:
     if not evo_url:
         return []
 
-    evo_data = safe_get_json(evo_url)
-    if not evo_data:
-        return []
-
-    pairs = []
-
-    def traverse(node):
-        src = node["species"]["name"]
-        for nxt in node.get("evolves_to", []):
-            dst = nxt["species"]["name"]
-            pairs.append((src, dst))
-            traverse(nxt)
-
-    traverse(evo_data["chain"])
-    return pairs
+    return parse_evolution_pairs(safe_get_json(evo_url))
 
 
 def get_type_relations() -> list[dict]:
     """Tabla de ventajas/desventajas entre tipos (para GraphRAG)."""
-    relations = []
-    types_list = safe_get_json("https://pokeapi.co/api/v2/type/")
-    if not types_list:
-        return relations
-
-    for t in tqdm(types_list.get("results", []), desc="Fetching type relations"):
-        tdata = safe_get_json(t["url"])
-        if not tdata:
-            continue
-
-        name = tdata["name"]
-        dr = tdata.get("damage_relations", {})
-
-        for rel in dr.get("double_damage_to", []):
-            relations.append({"source": name, "relation": "STRONG_AGAINST", "target": rel["name"]})
-        for rel in dr.get("double_damage_from", []):
-            relations.append({"source": name, "relation": "WEAK_AGAINST", "target": rel["name"]})
-
-    return relations
+    return asyncio.run(fetch_type_relations())
 
 
 # ╔════════════════════════════════════════════════════════════╗
@@ -107,17 +84,17 @@ def get_type_relations() -> list[dict]:
 # ╚════════════════════════════════════════════════════════════╝
 
 def save_partial_batch(records: list, evo_pairs: list, batch_number: int):
-    """Guarda los datos de un batch a disco (CSV y JSONL)."""
-    os.makedirs("data/structured/batches", exist_ok=True)
-    csv_path = f"data/structured/batches/pokedex_batch_{batch_number:03}.csv"
-    evo_path = f"data/structured/batches/evolutions_batch_{batch_number:03}.csv"
+    """Guarda los datos de un batch a disco (Parquet tipado; CSV si PIPELINE_FORMAT=csv)."""
+    batch_dir = "data/structured/batches"
+    pokedex_path = output_path(batch_dir, f"pokedex_batch_{batch_number:03}")
+    evo_path = output_path(batch_dir, f"evolutions_batch_{batch_number:03}")
 
-    df = pd.DataFrame(records)
-    df.to_csv(csv_path, index=False)
+    write_table(records, pokedex_path, POKEDEX_SCHEMA)
     if evo_pairs:
-        pd.DataFrame(sorted(set(evo_pairs)), columns=["source", "target"]).to_csv(evo_path, index=False)
+        pairs = [{"source": s, "target": t} for s, t in sorted(set(evo_pairs))]
+        write_table(pairs, evo_path, EVOLUTIONS_SCHEMA)
 
-    print(f"💾 Guardado: {csv_path} ({len(df)} Pokémon) — {len(evo_pairs)} evoluciones.")
+    print(f"💾 Guardado: {pokedex_path} ({len(records)} Pokémon) — {len(evo_pairs)} evoluciones.")
 
 
 # ╔════════════════════════════════════════════════════════════╗
@@ -133,52 +110,17 @@ def pokeapi_resource(limit_per_page: int = 100, start_offset: int = 0, save_ever
     - save_every: número de Pokémon antes de guardar un archivo temporal.
     """
 
-    base_url = f"https://pokeapi.co/api/v2/pokemon?limit={limit_per_page}&offset={start_offset}"
-    all_records = []
-    all_pairs = []
-    batch_counter = start_offset // limit_per_page + 1
-
-    while base_url:
-        resp = safe_get_json(base_url)
-        if not resp:
-            print(f"⚠️ No se pudo obtener {base_url}, deteniendo paginación.")
-            break
-
-        for entry in tqdm(resp.get("results", []), desc=f"Fetching Pokémon batch {batch_counter}"):
-            pokemon = safe_get_json(entry["url"])
-            if not pokemon:
-                continue
-
-            # ✅ Fallback para variantes (usa species_url en lugar de id directo)
-            species_data = get_species_data(pokemon["id"], pokemon["species"]["url"])
-            evo_url = species_data.get("evolution_chain_url")
-            all_pairs.extend(get_evolution_pairs(evo_url))
-
-            all_records.append({
-                "id": pokemon["id"],
-                "name": pokemon["name"],
-                "species_name": pokemon["species"]["name"],
-                "types": pokemon["types"],
-                "abilities": pokemon["abilities"],
-                "stats": pokemon["stats"],
-                "height": pokemon["height"],
-                "weight": pokemon["weight"],
-                "species": species_data,
-            })
-
-            # Guardar cada cierto número de Pokémon
-            if len(all_records) >= save_every:
-                save_partial_batch(all_records, all_pairs, batch_counter)
-                all_records.clear()
-                all_pairs.clear()
-                batch_counter += 1
-
-        base_url = resp.get("next")
-
-    # Guardar lo que quede al final
-    if all_records:
-        save_partial_batch(all_records, all_pairs, batch_counter)
-    
+    # Descarga concurrente y con rate limit (ver pokeapi_async); los batches
+    # se guardan en disco con la misma numeración que la versión secuencial.
+    asyncio.run(
+        ingest_all(
+            limit_per_page=limit_per_page,
+            start_offset=start_offset,
+            save_every=save_every,
+            on_batch=save_partial_batch,
+        )
+    )
+
     yield from []
 
 
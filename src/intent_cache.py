@@ -0,0 +1,190 @@
+"""
+intent_cache.py
+────────────────────────────────────────────
+Intent extraction cache for Pokémon RAG system.
+Keys on a normalized query; LRU + TTL eviction; in-process or SQLite backend.
+────────────────────────────────────────────
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# ─────────────────────────────────────────────
+# Config
+# ─────────────────────────────────────────────
+INTENT_CACHE_BACKEND = os.getenv("INTENT_CACHE_BACKEND", "memory")  # memory | sqlite | off
+INTENT_CACHE_PATH = os.getenv("INTENT_CACHE_PATH", "data/cache/intent_cache.sqlite")
+INTENT_CACHE_MAX_SIZE = int(os.getenv("INTENT_CACHE_MAX_SIZE", "10000"))
+INTENT_CACHE_TTL_SEC = float(os.getenv("INTENT_CACHE_TTL_SEC", str(24 * 3600)))
+
+
+def normalize_query(query: str) -> str:
+    """'How does Eevee evolve?' and 'how does eevee evolve' → 'how does eevee evolve'."""
+    text = unicodedata.normalize("NFKD", query.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# ─────────────────────────────────────────────
+# Backends
+# ─────────────────────────────────────────────
+class InMemoryBackend:
+    """Thread-safe LRU dict with per-entry expiry."""
+
+    def __init__(self, max_size: int = INTENT_CACHE_MAX_SIZE, ttl: float = INTENT_CACHE_TTL_SEC):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict):
+        with self._lock:
+            self._data[key] = (value, time.time() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """On-disk LRU + TTL cache, survives restarts."""
+
+    def __init__(self, path: str = INTENT_CACHE_PATH, max_size: int = INTENT_CACHE_MAX_SIZE, ttl: float = INTENT_CACHE_TTL_SEC):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS intent_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_intent_cache_access ON intent_cache(last_access)")
+        self._conn.commit()
+        # Row count kept in step with our own writes, so set() only prunes when over max_size
+        self._count = self._conn.execute("SELECT COUNT(*) FROM intent_cache").fetchone()[0]
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM intent_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] + self.ttl < now:
+                self._conn.execute("DELETE FROM intent_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                return None
+            self._conn.execute("UPDATE intent_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def set(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM intent_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO intent_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if not exists:
+                self._count += 1
+            if self._count > self.max_size:
+                self._conn.execute(
+                    """
+                    DELETE FROM intent_cache WHERE key IN (
+                        SELECT key FROM intent_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_size,),
+                )
+                self._count = self._conn.execute("SELECT COUNT(*) FROM intent_cache").fetchone()[0]
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM intent_cache")
+            self._conn.commit()
+            self._count = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM intent_cache").fetchone()[0]
+
+
+# ─────────────────────────────────────────────
+# Cache facade
+# ─────────────────────────────────────────────
+class IntentCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, query: str) -> dict | None:
+        value = self.backend.get(normalize_query(query))
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, query: str, parsed: dict):
+        self.backend.set(normalize_query(query), parsed)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else None,
+        }
+
+
+def make_intent_cache(backend: str = INTENT_CACHE_BACKEND) -> IntentCache | None:
+    """Build the cache configured by INTENT_CACHE_BACKEND (None when disabled)."""
+    if backend == "off":
+        return None
+    if backend == "sqlite":
+        return IntentCache(SQLiteBackend())
+    if backend == "memory":
+        return IntentCache(InMemoryBackend())
+    raise ValueError(f"❌ Unknown INTENT_CACHE_BACKEND: {backend}")
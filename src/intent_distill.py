@@ -0,0 +1,305 @@
+"""
+intent_distill.py
+────────────────────────────────────────────
+Local intent classifier distilled from persisted IntentRouter history.
+- Multi-label logistic regression (one-vs-rest) over hashed sparse n-gram features
+- Dictionary entity tagger (gazetteer + entities seen in LLM outputs)
+- Offline evaluation against the LLM router (agreement + latency)
+
+Usage:
+    uv run python src/intent_distill.py train
+    uv run python src/intent_distill.py eval
+────────────────────────────────────────────
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import argparse
+from typing import Any, Dict, List
+
+import numpy as np
+
+from intent_fastpath import Gazetteer, display_name, normalize
+
+# ─────────────────────────────────────────────
+# Config
+# ─────────────────────────────────────────────
+ROUTER_HISTORY_PATH = os.getenv("ROUTER_HISTORY_PATH", "data/router_logs/router_history.jsonl")
+DISTILL_MODEL_PATH = os.getenv("DISTILL_MODEL_PATH", "data/router_logs/intent_classifier.npz")
+DISTILL_REPORT_PATH = os.getenv("DISTILL_REPORT_PATH", "data/router_logs/distill_report.json")
+DISTILL_MIN_CONFIDENCE = float(os.getenv("DISTILL_MIN_CONFIDENCE", "0.85"))
+
+N_FEATURES = 2 ** 16
+
+
+# ─────────────────────────────────────────────
+# Router logs
+# ─────────────────────────────────────────────
+def load_router_logs(path: str = ROUTER_HISTORY_PATH) -> List[Dict]:
+    """Successful LLM-routed entries only (pre-router answers are not ground truth)."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("success") and entry.get("router", "llm") == "llm" and entry.get("parsed"):
+                records.append(entry)
+    return records
+
+
+def intent_labels(parsed: Dict) -> List[str]:
+    """Entity-agnostic labels of an intent JSON: 'factual:type', 'relational:evolves_to', 'semantic'."""
+    labels = set()
+    for intent in parsed.get("intents", []):
+        itype = intent.get("type")
+        if itype == "semantic":
+            labels.add("semantic")
+            continue
+        for attr in intent.get("attributes") or []:
+            labels.add(f"{itype}:{attr}")
+    return sorted(labels)
+
+
+def intent_signature(parsed: Dict | None) -> set:
+    """Comparable form of an intent JSON (type, lowercased entity, attributes)."""
+    if not parsed:
+        return set()
+    return {
+        (i.get("type"), (i.get("entity") or "").lower(), frozenset(i.get("attributes") or []))
+        for i in parsed.get("intents", [])
+    }
+
+
+# ─────────────────────────────────────────────
+# Features
+# ─────────────────────────────────────────────
+def _hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) % N_FEATURES
+
+
+def featurize(query: str, tagger: Gazetteer) -> tuple[np.ndarray, np.ndarray]:
+    """Hashed word 1-2 grams + char 3-5 grams, with entity mentions masked by their kind."""
+    text = normalize(query)
+    for start, end, values in reversed(tagger.match(query)):
+        kind = next((k for k, _ in values if k in ("pokemon", "type", "ability")), None)
+        if kind:
+            text = text[:start] + f" <{kind}> " + text[end:]
+
+    words = re.findall(r"<\w+>|\w+", text)
+    tokens = [f"w:{w}" for w in words]
+    tokens += [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    padded = f" {' '.join(words)} "
+    for n in (3, 4, 5):
+        tokens += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+
+    counts: Dict[int, float] = {}
+    for tok in tokens:
+        idx = _hash(tok)
+        counts[idx] = counts.get(idx, 0.0) + 1.0
+    idx = np.fromiter(counts.keys(), dtype=np.int64)
+    val = np.fromiter(counts.values(), dtype=np.float32)
+    return idx, val / np.linalg.norm(val)
+
+
+# ─────────────────────────────────────────────
+# Model
+# ─────────────────────────────────────────────
+class LocalIntentClassifier:
+    """
+    Pre-router backed by a distilled model. `route(query)` returns the IntentRouter
+    JSON shape when every label decision is confident, otherwise None (→ LLM).
+    """
+
+    name = "local"
+
+    def __init__(self, labels: List[str], entity_vocab: List[str], weights: np.ndarray | None = None,
+                 bias: np.ndarray | None = None, min_confidence: float = DISTILL_MIN_CONFIDENCE):
+        self.labels = labels
+        self.entity_vocab = entity_vocab
+        self.weights = weights if weights is not None else np.zeros((len(labels), N_FEATURES), dtype=np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(labels), dtype=np.float32)
+        self.min_confidence = min_confidence
+        self.tagger = Gazetteer(pokemon=entity_vocab)
+
+    # ── training ────────────────────────────────
+    @classmethod
+    def train(cls, records: List[Dict], extra_entities: List[str] = (), epochs: int = 15, lr: float = 0.5, l2: float = 1e-5):
+        labels = sorted({lab for r in records for lab in intent_labels(r["parsed"])})
+        entity_vocab = sorted(
+            {(i.get("entity") or "").lower() for r in records for i in r["parsed"].get("intents", []) if i.get("entity")}
+            | {e.lower() for e in extra_entities}
+        )
+        model = cls(labels, entity_vocab)
+        label_index = {lab: k for k, lab in enumerate(labels)}
+
+        samples = []
+        for r in records:
+            y = np.zeros(len(labels), dtype=np.float32)
+            for lab in intent_labels(r["parsed"]):
+                y[label_index[lab]] = 1.0
+            samples.append((*featurize(r["query"], model.tagger), y))
+
+        rng = np.random.default_rng(0)
+        for _ in range(epochs):
+            for k in rng.permutation(len(samples)):
+                idx, val, y = samples[k]
+                scores = model.weights[:, idx] @ val + model.bias
+                err = 1.0 / (1.0 + np.exp(-scores)) - y
+                model.weights[:, idx] -= lr * (np.outer(err, val) + l2 * model.weights[:, idx])
+                model.bias -= lr * err
+        return model
+
+    # ── persistence ─────────────────────────────
+    def save(self, path: str = DISTILL_MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = json.dumps({"labels": self.labels, "entity_vocab": self.entity_vocab, "n_features": N_FEATURES})
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, meta=np.array(meta))
+
+    @classmethod
+    def load(cls, path: str = DISTILL_MODEL_PATH, min_confidence: float = DISTILL_MIN_CONFIDENCE):
+        data = np.load(path)
+        meta = json.loads(str(data["meta"]))
+        return cls(meta["labels"], meta["entity_vocab"], data["weights"], data["bias"], min_confidence)
+
+    # ── inference ───────────────────────────────
+    def predict_proba(self, query: str) -> Dict[str, float]:
+        idx, val = featurize(query, self.tagger)
+        scores = self.weights[:, idx] @ val + self.bias
+        probs = 1.0 / (1.0 + np.exp(-scores))
+        return dict(zip(self.labels, probs.tolist()))
+
+    def predict(self, query: str) -> Dict[str, Any]:
+        """Build the intent JSON regardless of the confidence threshold."""
+        probs = self.predict_proba(query)
+        chosen = [lab for lab, p in probs.items() if p >= 0.5]
+        # Confidence = weakest include/exclude decision over all labels
+        confidence = round(min((max(p, 1 - p) for p in probs.values()), default=0.0), 3)
+        entities = self.tagger.detect_entities(query)
+
+        grouped: Dict[str, List[str]] = {}
+        for lab in chosen:
+            itype, _, attr = lab.partition(":")
+            grouped.setdefault(itype, [])
+            if attr:
+                grouped[itype].append(attr)
+
+        intents = []
+        entity = display_name(entities[0]) if entities else None
+        for itype in ("factual", "relational", "semantic"):
+            if itype in grouped:
+                intents.append({"type": itype, "entity": entity, "attributes": grouped[itype], "confidence": confidence})
+
+        # Structured intents need exactly one subject; otherwise the LLM must split topics
+        if any(i["type"] != "semantic" for i in intents) and len(entities) != 1:
+            confidence = 0.0
+
+        return {"query": query, "intents": intents, "confidence": confidence, "router": self.name}
+
+    def route(self, query: str) -> Dict[str, Any] | None:
+        result = self.predict(query)
+        if not result["intents"] or result["confidence"] < self.min_confidence:
+            return None
+        return result
+
+
+# ─────────────────────────────────────────────
+# Offline evaluation
+# ─────────────────────────────────────────────
+def split_records(records: List[Dict], test_fraction: float = 0.2):
+    """Deterministic split by query hash, so duplicates never leak across sets."""
+    train, test = [], []
+    for r in records:
+        bucket = zlib.crc32(normalize(r["query"]).encode("utf-8")) % 100
+        (test if bucket < test_fraction * 100 else train).append(r)
+    return train, test
+
+
+def _percentiles(values: List[float]) -> Dict[str, float | None]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    arr = np.array(values)
+    return {f"p{q}": round(float(np.percentile(arr, q)), 3) for q in (50, 95, 99)}
+
+
+def evaluate(model: LocalIntentClassifier, records: List[Dict]) -> Dict[str, Any]:
+    """Agreement with the LLM router and per-query latency, overall and on locally served queries."""
+    exact, served, served_agree = 0, 0, 0
+    tp = fp = fn = 0
+    local_ms = []
+
+    for r in records:
+        start = time.perf_counter()
+        predicted = model.predict(r["query"])
+        local_ms.append((time.perf_counter() - start) * 1000)
+
+        agree = intent_signature(predicted) == intent_signature(r["parsed"])
+        exact += agree
+        if predicted["intents"] and predicted["confidence"] >= model.min_confidence:
+            served += 1
+            served_agree += agree
+
+        pred_labels = set(intent_labels(predicted))
+        true_labels = set(intent_labels(r["parsed"]))
+        tp += len(pred_labels & true_labels)
+        fp += len(pred_labels - true_labels)
+        fn += len(true_labels - pred_labels)
+
+    n = len(records) or 1
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "n_queries": len(records),
+        "exact_agreement": round(exact / n, 3),
+        "label_precision": round(precision, 3),
+        "label_recall": round(recall, 3),
+        "label_f1": round(2 * precision * recall / (precision + recall), 3) if precision + recall else 0.0,
+        "min_confidence": model.min_confidence,
+        "served_locally": round(served / n, 3),
+        "agreement_when_served": round(served_agree / served, 3) if served else None,
+        "latency_ms_local": _percentiles(local_ms),
+        "latency_ms_llm": _percentiles([r["elapsed_sec"] * 1000 for r in records if r.get("elapsed_sec") is not None]),
+    }
+
+
+# ─────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Train / evaluate the distilled intent classifier.")
+    parser.add_argument("command", choices=["train", "eval"])
+    parser.add_argument("--logs", default=ROUTER_HISTORY_PATH)
+    parser.add_argument("--model", default=DISTILL_MODEL_PATH)
+    parser.add_argument("--report", default=DISTILL_REPORT_PATH)
+    args = parser.parse_args()
+
+    records = load_router_logs(args.logs)
+    if not records:
+        raise RuntimeError(f"❌ No successful LLM router logs found in {args.logs}")
+    train, test = split_records(records)
+    print(f"📚 {len(records)} router logs → {len(train)} train / {len(test)} test")
+
+    if args.command == "train":
+        start = time.perf_counter()
+        model = LocalIntentClassifier.train(train)
+        print(f"🧠 Trained {len(model.labels)} labels in {time.perf_counter() - start:.1f}s")
+        model.save(args.model)
+        print(f"💾 Model saved → {args.model}")
+    else:
+        model = LocalIntentClassifier.load(args.model)
+
+    report = evaluate(model, test or train)
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"📊 Report saved → {args.report}")
+
+
+if __name__ == "__main__":
+    main()
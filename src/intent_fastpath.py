@@ -0,0 +1,370 @@
+"""
+intent_fastpath.py
+────────────────────────────────────────────
+Deterministic gazetteer pre-router for Pokémon RAG system.
+Answers simple single-entity questions without an LLM hop and
+defers to the IntentRouter LLM when coverage is ambiguous.
+────────────────────────────────────────────
+"""
+
+import os
+import re
+import time
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterable, List, Tuple
+
+# ─────────────────────────────────────────────
+# Config
+# ─────────────────────────────────────────────
+FASTPATH_MIN_CONFIDENCE = float(os.getenv("FASTPATH_MIN_CONFIDENCE", "0.8"))
+
+# ─────────────────────────────────────────────
+# Vocabulary (English + Spanish)
+# ─────────────────────────────────────────────
+TYPE_NAMES_ES = {
+    "normal": ["normal"], "fire": ["fuego"], "water": ["agua"], "grass": ["planta"],
+    "electric": ["eléctrico", "electrico"], "ice": ["hielo"], "fighting": ["lucha"],
+    "poison": ["veneno"], "ground": ["tierra"], "flying": ["volador"], "psychic": ["psíquico"],
+    "bug": ["bicho"], "rock": ["roca"], "ghost": ["fantasma"], "dragon": ["dragón"],
+    "dark": ["siniestro"], "steel": ["acero"], "fairy": ["hada"],
+}
+
+# Attribute keywords, keyed by the schema attributes of INTENT_PROMPT
+ATTRIBUTE_KEYWORDS = {
+    "type": ["type", "types", "typing", "element", "tipo", "tipos", "elemento"],
+    "evolves_to": [
+        "evolve", "evolves", "evolve into", "evolves into", "evolution", "evolutions", "evolved",
+        "evoluciona", "evolucionar", "evoluciona a", "evolución", "evoluciones",
+    ],
+    "evolves_from": [
+        "evolves from", "evolve from", "evolved from", "pre-evolution", "pre evolution", "preevolution",
+        "evoluciona de", "preevolución", "pre-evolución", "viene de",
+    ],
+    "strong_against": [
+        "strong against", "effective against", "super effective", "good against", "strengths",
+        "fuerte contra", "eficaz contra", "súper eficaz", "bueno contra", "fortalezas",
+    ],
+    "weak_against": [
+        "weak", "weak against", "weak to", "weakness", "weaknesses", "vulnerable to",
+        "débil", "débil contra", "débil a", "debilidad", "debilidades", "vulnerable a",
+    ],
+    "ability": ["ability", "abilities", "habilidad", "habilidades"],
+    "stat": [
+        "stat", "stats", "base stats", "hp", "attack", "defense", "special attack", "special defense",
+        "speed", "estadísticas", "estadistica", "ps", "ataque", "defensa", "ataque especial",
+        "defensa especial", "velocidad",
+    ],
+    "category": ["category", "legendary", "mythical", "categoría", "legendario", "mítico"],
+}
+
+FACTUAL_ATTRIBUTES = {"type", "ability", "stat", "category"}
+RELATIONAL_ATTRIBUTES = {"evolves_to", "evolves_from", "strong_against", "weak_against"}
+# Attributes that make sense when the only subject is a Type
+TYPE_SUBJECT_ATTRIBUTES = {"strong_against", "weak_against"}
+
+# Phrases that signal a conceptual question → always defer to the LLM
+SEMANTIC_CUES = [
+    "why", "explain", "strategy", "strategies", "best", "compare", "comparison", "difference",
+    "recommend", "should i", "team", "how does it work", "what is the meaning",
+    "por qué", "porque", "explica", "explícame", "estrategia", "mejor", "compara", "diferencia",
+    "recomienda", "debería", "equipo",
+]
+
+FUNCTION_WORDS = {
+    "what", "what's", "whats", "which", "how", "does", "do", "did", "is", "are", "was", "the",
+    "and", "or", "a", "an", "of", "to", "in", "on", "for", "with", "about", "into", "from", "at",
+    "by", "its", "it", "can", "me", "tell", "that", "this", "these", "those", "has", "have",
+    "pokemon", "pokémon", "i", "my", "please", "there", "into", "get", "gets", "become", "becomes",
+    "que", "qué", "cual", "cuál", "cuales", "cuáles", "como", "cómo", "es", "son", "el", "la",
+    "los", "las", "un", "una", "de", "del", "en", "y", "o", "se", "su", "sus", "tiene",
+    "tienen", "dime", "mi", "al", "por", "favor", "hay", "contra", "s",
+}
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents, one output char per input char (offsets stay valid)."""
+    out = []
+    for ch in text.lower():
+        base = unicodedata.normalize("NFKD", ch)[0]
+        out.append(base)
+    return "".join(out)
+
+
+# FUNCTION_WORDS as matched against normalized query text (built once, not per query)
+NORMALIZED_FUNCTION_WORDS = frozenset(normalize(w) for w in FUNCTION_WORDS)
+
+
+# ─────────────────────────────────────────────
+# Aho-Corasick multi-pattern matcher
+# ─────────────────────────────────────────────
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton over characters; patterns carry arbitrary values."""
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, Any]]] = [[]]
+
+    def add(self, pattern: str, value: Any):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                self.goto[node][ch] = nxt
+            node = nxt
+        if (len(pattern), value) not in self.out[node]:
+            self.out[node].append((len(pattern), value))
+
+    def build(self):
+        """Compute failure links (BFS) and merge output sets."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+        return self
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, Any]]:
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for length, value in self.out[node]:
+                yield i - length + 1, i + 1, value
+
+
+# ─────────────────────────────────────────────
+# Gazetteer
+# ─────────────────────────────────────────────
+class Gazetteer:
+    """In-memory dictionary of Pokémon, Type and Ability names plus attribute keywords."""
+
+    def __init__(self, pokemon: Iterable[str] = (), types: Iterable[str] = (), abilities: Iterable[str] = ()):
+        self.matcher = AhoCorasick()
+        self.sizes = {"pokemon": 0, "type": 0, "ability": 0}
+
+        for name in pokemon:
+            self._add_entity("pokemon", name)
+        for name in set(types) | set(TYPE_NAMES_ES):
+            self._add_entity("type", name)
+            for alias in TYPE_NAMES_ES.get(name.lower(), []):
+                self._add_surface(alias, ("type", name.lower()))
+        for name in abilities:
+            self._add_entity("ability", name)
+        for attr, keywords in ATTRIBUTE_KEYWORDS.items():
+            for kw in keywords:
+                self._add_surface(kw, ("attribute", attr))
+        for cue in SEMANTIC_CUES:
+            self._add_surface(cue, ("cue", cue))
+
+        self.matcher.build()
+
+    def _add_surface(self, surface: str, value: Tuple[str, str]):
+        surface = normalize(surface.strip())
+        if surface:
+            self.matcher.add(surface, value)
+
+    def _add_entity(self, kind: str, name: str):
+        if not name:
+            return
+        canonical = str(name).strip().lower()
+        self.sizes[kind] += 1
+        self._add_surface(canonical, (kind, canonical))
+        if "-" in canonical:
+            self._add_surface(canonical.replace("-", " "), (kind, canonical))
+
+    def match(self, query: str) -> List[Tuple[int, int, List[Tuple[str, str]]]]:
+        """
+        Leftmost-longest, non-overlapping, word-bounded matches.
+        Returns (start, end, [values]) — a span can carry several values (e.g. type + keyword).
+        """
+        text = normalize(query)
+        spans: Dict[Tuple[int, int], List[Tuple[str, str]]] = {}
+        for start, end, value in self.matcher.iter_matches(text):
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if end < len(text) and text[end].isalnum():
+                continue
+            spans.setdefault((start, end), []).append(value)
+
+        selected, last_end = [], -1
+        for (start, end) in sorted(spans, key=lambda s: (s[0], -(s[1] - s[0]))):
+            if start >= last_end:
+                selected.append((start, end, spans[(start, end)]))
+                last_end = end
+        return selected
+
+    def detect_entities(self, query: str, max_entities: int = 3) -> List[str]:
+        """Entity names (Pokémon first, then Types) found in the query — usable as a speculative detector."""
+        found = {"pokemon": [], "type": []}
+        for _, _, values in self.match(query):
+            for kind, canonical in values:
+                if kind in found and canonical not in found[kind]:
+                    found[kind].append(canonical)
+        return (found["pokemon"] + found["type"])[:max_entities]
+
+
+# ─────────────────────────────────────────────
+# Fast-path router
+# ─────────────────────────────────────────────
+def display_name(canonical: str) -> str:
+    return canonical.title()
+
+
+class FastPathRouter:
+    """
+    Deterministic pre-router. `route(query)` returns the IntentRouter JSON shape
+    (plus an overall "confidence") or None when the LLM should decide.
+    """
+
+    name = "fastpath"
+
+    def __init__(self, gazetteer: Gazetteer, min_confidence: float = FASTPATH_MIN_CONFIDENCE):
+        self.gazetteer = gazetteer
+        self.min_confidence = min_confidence
+
+    def analyze(self, query: str) -> Dict[str, Any] | None:
+        """Build intents from gazetteer matches, regardless of the confidence threshold."""
+        matches = self.gazetteer.match(query)
+        text = normalize(query)
+
+        entities, attributes, cues = [], [], []
+        for start, end, values in matches:
+            kinds = {k for k, _ in values}
+            if "cue" in kinds:
+                cues.append(text[start:end])
+            for kind, canonical in values:
+                if kind == "attribute":
+                    attributes.append((start, canonical))
+                elif kind in ("pokemon", "type", "ability"):
+                    entities.append((start, kind, canonical))
+
+        pokemon = [(pos, c) for pos, k, c in entities if k == "pokemon"]
+        types = [(pos, c) for pos, k, c in entities if k == "type"]
+        abilities = [c for _, k, c in entities if k == "ability"]
+
+        # Type names next to a Pokémon ("is Charizard a fire type?") imply the "type" attribute
+        if pokemon and types:
+            attributes.extend((pos, "type") for pos, _ in types)
+            subjects = pokemon
+        else:
+            subjects = pokemon or types
+        if pokemon and abilities:
+            attributes.append((pokemon[0][0], "ability"))
+
+        if cues or not subjects or not attributes:
+            return None
+        # A Type alone can only be the subject of type-effectiveness questions;
+        # "which pokemon are fire type?" is a listing query → LLM decides
+        if not pokemon and any(attr not in TYPE_SUBJECT_ATTRIBUTES for _, attr in attributes):
+            return None
+
+        # Assign each attribute keyword to the nearest subject mention
+        subject_names = list(dict.fromkeys(c for _, c in subjects))
+        per_subject: Dict[str, List[str]] = {c: [] for c in subject_names}
+        for pos, attr in attributes:
+            nearest = min(subjects, key=lambda s: abs(s[0] - pos))[1]
+            if attr not in per_subject[nearest]:
+                per_subject[nearest].append(attr)
+
+        # Coverage: content words not explained by any match lower the confidence
+        covered = [False] * len(text)
+        for start, end, _ in matches:
+            for i in range(start, end):
+                covered[i] = True
+        uncovered = [
+            m.group(0) for m in re.finditer(r"[\w\-]+", text)
+            if m.group(0) not in NORMALIZED_FUNCTION_WORDS and not all(covered[m.start():m.end()])
+        ]
+
+        base = 0.95 if len(subject_names) == 1 else 0.75
+        confidence = round(max(0.0, base - 0.1 * len(uncovered)), 2)
+
+        intents = []
+        for subject, attrs in per_subject.items():
+            factual = [a for a in attrs if a in FACTUAL_ATTRIBUTES]
+            relational = [a for a in attrs if a in RELATIONAL_ATTRIBUTES]
+            if factual:
+                intents.append({"type": "factual", "entity": display_name(subject), "attributes": factual, "confidence": confidence})
+            if relational:
+                intents.append({"type": "relational", "entity": display_name(subject), "attributes": relational, "confidence": confidence})
+
+        if not intents:
+            return None
+
+        return {
+            "query": query,
+            "intents": intents,
+            "confidence": confidence,
+            "uncovered": uncovered,
+            "router": self.name,
+        }
+
+    def route(self, query: str) -> Dict[str, Any] | None:
+        result = self.analyze(query)
+        if result is None or result["confidence"] < self.min_confidence:
+            return None
+        return result
+
+
+# ─────────────────────────────────────────────
+# Loading names from MongoDB + Neo4j
+# ─────────────────────────────────────────────
+def load_gazetteer() -> Gazetteer:
+    """
+    Build the gazetteer from the names already stored in MongoDB and Neo4j.
+    Each source fails soft: missing stores just shrink the dictionary.
+    """
+    pokemon, types, abilities = set(), set(), set()
+
+    try:
+        from mongo_query import get_collection
+
+        collection = get_collection()
+        pokemon.update(n for n in collection.distinct("name") if n)
+        pokemon.update(n for n in collection.distinct("species_name") if n)
+        types.update(n for n in collection.distinct("types.type.name") if n)
+        abilities.update(n for n in collection.distinct("abilities.ability.name") if n)
+    except Exception as e:
+        print(f"⚠️ Gazetteer: MongoDB names unavailable ({e})")
+
+    try:
+        import graph_query
+
+        with graph_query.get_driver().session(database=graph_query.NEO4J_DATABASE) as session:
+            types.update(r["name"] for r in session.run("MATCH (t:Type) RETURN t.name AS name") if r["name"])
+            abilities.update(r["name"] for r in session.run("MATCH (a:Ability) RETURN a.name AS name") if r["name"])
+    except Exception as e:
+        print(f"⚠️ Gazetteer: Neo4j names unavailable ({e})")
+
+    return Gazetteer(pokemon=pokemon, types=types, abilities=abilities)
+
+
+# ─────────────────────────────────────────────
+# Example usage
+# ─────────────────────────────────────────────
+if __name__ == "__main__":
+    import json
+
+    start = time.perf_counter()
+    gazetteer = load_gazetteer()
+    print(f"📖 Gazetteer built in {time.perf_counter() - start:.2f}s → {gazetteer.sizes}")
+
+    fast_path = FastPathRouter(gazetteer)
+    for q in ["What type is Vaporeon?", "¿Contra qué es débil Charizard?", "Why is Eevee so popular?"]:
+        start = time.perf_counter()
+        result = fast_path.analyze(q)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"\n🔍 {q}  ({elapsed_ms:.2f} ms)")
+        print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -13,6 +13,8 @@ from datetime import datetime, timezone
 from dotenv import load_dotenv, find_dotenv
 from openai import OpenAI
 
+from tracing import span
+
 # ─────────────────────────────────────────────
 # Load environment variables
 # ─────────────────────────────────────────────
@@ -21,6 +23,9 @@ API_KEY = os.getenv("OPENAI_API_KEY")
 if not API_KEY:
     raise ValueError("❌ Missing OPENAI_API_KEY in your environment")
 
+# Router history is appended here as JSON lines (training data for intent_distill.py)
+ROUTER_HISTORY_PATH = os.getenv("ROUTER_HISTORY_PATH", "data/router_logs/router_history.jsonl")
+
 # ─────────────────────────────────────────────
 # Prompt template
 # ─────────────────────────────────────────────
@@ -81,21 +86,41 @@ User question: "{question}"
 # Intent Router Class
 # ─────────────────────────────────────────────
 class IntentRouter:
-    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.0, max_retries: int = 2):
+    def __init__(self, model: str = "gpt-4o-mini", temperature: float = 0.0, max_retries: int = 2,
+                 pre_routers: list | None = None, history_path: str | None = ROUTER_HISTORY_PATH,
+                 cache=None):
         self.client = OpenAI(api_key=API_KEY)
         self.model = model
         self.temperature = temperature
         self.max_retries = max_retries
+        self.pre_routers = pre_routers or []  # objects with .name and .route(query) -> dict | None
+        self.history_path = history_path
+        self.cache = cache  # IntentCache or None
         self.history = []
 
+    def _record(self, log_entry: dict):
+        """Keep the log entry in memory and persist it, so routing data survives restarts."""
+        self.history.append(log_entry)
+        if not self.history_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
+            with open(self.history_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not persist router history: {e}")
+
     def _call_llm(self, prompt: str) -> str:
         """Make a chat completion call to the LLM."""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=self.temperature,
-        )
-        return response.choices[0].message.content
+        with span("router.llm_call", model=self.model, prompt_chars=len(prompt)) as s:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.temperature,
+            )
+            if response.usage:
+                s.set(prompt_tokens=response.usage.prompt_tokens, completion_tokens=response.usage.completion_tokens)
+            return response.choices[0].message.content
 
     def _validate_json(self, text: str) -> dict | None:
         """Validate and parse JSON response safely."""
@@ -125,8 +150,70 @@ class IntentRouter:
             except Exception:
                 return None
 
+    def _try_pre_routers(self, query: str) -> dict | None:
+        """Ask each deterministic pre-router in order; the first confident answer skips the LLM."""
+        for pre_router in self.pre_routers:
+            start_time = time.time()
+            parsed = pre_router.route(query)
+            if parsed:
+                self._record({
+                    "query": query,
+                    "response_raw": None,
+                    "parsed": parsed,
+                    "success": True,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "elapsed_sec": round(time.time() - start_time, 6),
+                    "attempts": 0,
+                    "router": pre_router.name,
+                    "cache_hit": False,
+                })
+                return parsed
+        return None
+
+    def _try_cache(self, query: str) -> dict | None:
+        """Serve a previously extracted result for the same normalized query."""
+        if self.cache is None:
+            return None
+        start_time = time.perf_counter()
+        cached = self.cache.get(query)
+        if cached is None:
+            return None
+        parsed = {**cached, "query": query}
+        self._record({
+            "query": query,
+            "response_raw": None,
+            "parsed": parsed,
+            "success": True,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "elapsed_sec": round(time.perf_counter() - start_time, 6),
+            "attempts": 0,
+            "router": "cache",
+            "cache_hit": True,
+        })
+        return parsed
+
     def extract_intents(self, query: str) -> dict:
         """Extract multiple intents from a user's query."""
+        with span("router.extract_intents", query_chars=len(query)) as s:
+            parsed = self._extract_intents(query)
+            s.set(
+                router=self.history[-1].get("router"),
+                cache_hit=self.history[-1].get("cache_hit"),
+                intents=len(parsed.get("intents", [])),
+            )
+            return parsed
+
+    def _extract_intents(self, query: str) -> dict:
+        parsed = self._try_cache(query)
+        if parsed:
+            return parsed
+
+        parsed = self._try_pre_routers(query)
+        if parsed:
+            if self.cache is not None:
+                self.cache.set(query, parsed)
+            return parsed
+
         prompt = INTENT_PROMPT.format(question=query)
         start_time = time.time()
         parsed = None
@@ -156,12 +243,17 @@ class IntentRouter:
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "elapsed_sec": elapsed,
             "attempts": attempt + 1,
+            "router": "llm",
+            "cache_hit": False,
         }
-        self.history.append(log_entry)
+        self._record(log_entry)
 
         if not success:
             raise ValueError(f"❌ Failed to produce valid JSON after {self.max_retries} attempts.\nRaw response:\n{response_text}")
 
+        if self.cache is not None:
+            self.cache.set(query, parsed)
+
         return parsed
 
 
@@ -1,29 +1,196 @@
 import os
+import csv
+import gzip
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from dotenv import load_dotenv, find_dotenv
 from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError
+import pyarrow as pa
 from tqdm import tqdm
 
+from pokedex_io import StreamingWriter, output_path
+
 # ───────────────────────────────────────────────
 # 🔧 CONFIG
 # ───────────────────────────────────────────────
-NEO4J_URI = "bolt://localhost:7687"
-NEO4J_USER = "neo4j"
-NEO4J_PASSWORD = "supersecure123"
-IMPORT_DIR = "/import"
+load_dotenv(find_dotenv())
+
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "supersecure123")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
 LOCAL_DIR = "data/graph"
 EXPORT_DIR = "data/exports"
 
+# Filas enviadas por query (cliente) y filas por transacción (servidor)
+LOAD_BATCH_SIZE = int(os.getenv("NEO4J_LOAD_BATCH_SIZE", "5000"))
+TX_ROWS = int(os.getenv("NEO4J_TX_ROWS", "1000"))
+LOAD_WORKERS = int(os.getenv("NEO4J_LOAD_WORKERS", "4"))
+MAX_RETRIES = 5
+EXPORT_BATCH_SIZE = int(os.getenv("NEO4J_EXPORT_BATCH_SIZE", "10000"))
+
+# ───────────────────────────────────────────────
+# 🧱 QUERIES (UNWIND $rows + CALL {…} IN TRANSACTIONS, MERGE sobre claves con constraint)
+# ───────────────────────────────────────────────
+CONSTRAINTS = [
+    "CREATE CONSTRAINT unique_pokemon IF NOT EXISTS FOR (p:Pokemon) REQUIRE p.name IS UNIQUE",
+    "CREATE CONSTRAINT unique_type IF NOT EXISTS FOR (t:Type) REQUIRE t.name IS UNIQUE",
+    "CREATE CONSTRAINT unique_ability IF NOT EXISTS FOR (a:Ability) REQUIRE a.name IS UNIQUE",
+]
+
+DELETE_ALL = "MATCH (n) CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {tx_rows} ROWS"
+
+BATCH_TEMPLATE = """
+UNWIND $rows AS row
+CALL {{
+    WITH row
+    {body}
+}} IN TRANSACTIONS OF {tx_rows} ROWS
+"""
+
+POKEMON_NODES = """
+    MERGE (p:Pokemon {name: row.name})
+    SET p.id = toInteger(row.id),
+        p.height = toInteger(row.height),
+        p.weight = toInteger(row.weight),
+        p.description = row.description,
+        p.generation = row.generation
+"""
+
+TYPE_NODES = "MERGE (:Type {name: row.name})"
+
+ABILITY_NODES = "MERGE (:Ability {name: row.ability})"
+
+HAS_TYPE = """
+    MATCH (p:Pokemon {name: row.pokemon})
+    MATCH (t:Type {name: row.type})
+    MERGE (p)-[:HAS_TYPE]->(t)
+"""
+
+EVOLVES_TO = """
+    MATCH (src:Pokemon {name: row.source})
+    MATCH (dst:Pokemon {name: row.target})
+    MERGE (src)-[:EVOLVES_TO]->(dst)
+"""
+
+# Relaciones entre tipos: una query estática por tipo de relación (sin apoc.merge.relationship)
+STRONG_AGAINST = """
+    MATCH (src:Type {name: row.source})
+    MATCH (dst:Type {name: row.target})
+    MERGE (src)-[:STRONG_AGAINST]->(dst)
+"""
+
+WEAK_AGAINST = """
+    MATCH (src:Type {name: row.source})
+    MATCH (dst:Type {name: row.target})
+    MERGE (src)-[:WEAK_AGAINST]->(dst)
+"""
+
+CAN_HAVE = """
+    MATCH (p:Pokemon {name: row.pokemon})
+    MATCH (a:Ability {name: row.ability})
+    MERGE (p)-[r:CAN_HAVE]->(a)
+    SET r.hidden = toBoolean(row.is_hidden),
+        r.slot = CASE
+                    WHEN row.slot IS NULL OR row.slot = '' THEN NULL
+                    ELSE toInteger(toFloat(row.slot))
+                END
+"""
+
+# Exportación compacta (lista de nodos / aristas)
+NODES_QUERY = """
+MATCH (n)
+RETURN elementId(n) AS id, labels(n)[0] AS label, n.name AS name, properties(n) AS properties
+"""
+
+EDGES_QUERY = """
+MATCH (a)-[r]->(b)
+RETURN a.name AS source, labels(a)[0] AS source_label, type(r) AS relation,
+       b.name AS target, labels(b)[0] AS target_label, properties(r) AS properties
+"""
+
+NODE_LIST_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("label", pa.string()),
+    ("name", pa.string()),
+    ("properties", pa.string()),
+])
+
+EDGE_LIST_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("source_label", pa.string()),
+    ("relation", pa.string()),
+    ("target", pa.string()),
+    ("target_label", pa.string()),
+    ("properties", pa.string()),
+])
+
 # ───────────────────────────────────────────────
 # 🧠 FUNCIONES AUXILIARES
 # ───────────────────────────────────────────────
-def run_query(session, query: str):
+def run_query(session, query: str, **params):
     """Ejecuta un bloque Cypher dentro de una sesión Neo4j."""
-    session.run(query)
+    return session.run(query, **params).consume()
+
+def iter_csv(file_name, where=None):
+    """Filas de data/graph/<file_name> una a una (sin cargar el archivo)."""
+    with open(os.path.join(LOCAL_DIR, file_name), encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if where is None or where(row):
+                yield row
+
+def distinct(rows, key):
+    seen = set()
+    for row in rows:
+        if row[key] not in seen:
+            seen.add(row[key])
+            yield {key: row[key]}
+
+def chunked(rows, size):
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
 
-def load_csv(session, file_name, query_template):
-    """Carga un CSV específico aplicando un bloque de Cypher."""
-    file_path = f"file:///{file_name}"
-    query = query_template.format(file=file_path)
-    run_query(session, query)
+def load_rows(driver, label, rows, body, batch_size=LOAD_BATCH_SIZE, tx_rows=TX_ROWS):
+    """
+    Envía las filas en batches de `batch_size`; el servidor confirma cada `tx_rows` filas.
+    MERGE es idempotente, así que un batch que falla por deadlock/transitorio se reintenta completo.
+    """
+    query = BATCH_TEMPLATE.format(body=body, tx_rows=tx_rows)
+    started = time.perf_counter()
+    total = 0
+    with driver.session(database=NEO4J_DATABASE) as session:
+        for batch in chunked(rows, batch_size):
+            for attempt in range(MAX_RETRIES):
+                try:
+                    run_query(session, query, rows=batch)
+                    break
+                except TransientError as e:
+                    if attempt == MAX_RETRIES - 1:
+                        raise
+                    wait = 0.5 * 2 ** attempt
+                    print(f"⚠️ {label}: error transitorio ({e.code}), reintentando en {wait:.1f}s...")
+                    time.sleep(wait)
+            total += len(batch)
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else float("inf")
+    print(f"   {label}: {total} filas en {elapsed:.1f}s ({rate:,.0f} filas/s)")
+    return total
+
+def load_parallel(driver, jobs, workers=LOAD_WORKERS):
+    """Cada tipo de arista en su propia sesión, en paralelo."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {label: pool.submit(load_rows, driver, label, rows, body) for label, rows, body in jobs}
+        return {label: fut.result() for label, fut in futures.items()}
+
+def delete_all(session, tx_rows=10_000):
+    """Borra el grafo en transacciones acotadas (no una sola transacción gigante)."""
+    run_query(session, DELETE_ALL.format(tx_rows=tx_rows))
 
 def check_count(session, label=None, rel_type=None):
     """Imprime el número de nodos o relaciones existentes."""
@@ -34,117 +201,110 @@ def check_count(session, label=None, rel_type=None):
         result = session.run(f"MATCH ()-[r:{rel_type}]->() RETURN count(r) AS c").single()
         print(f"📊 {rel_type}: {result['c']} relaciones")
 
-def export_graphml(session, export_path):
-    """Exporta todo el grafo completo a un archivo GraphML local (modo stream)."""
-    print("\n💾 Exportando grafo completo a GraphML (modo stream)...")
+def export_graphml(session, export_path, batch_size=EXPORT_BATCH_SIZE, compress=False):
+    """
+    Exporta el grafo completo a GraphML consumiendo el stream de APOC por lotes:
+    cada fila (`batchSize` elementos) se escribe al llegar, con memoria constante en el cliente.
+    compress=True escribe <export_path>.gz.
+    """
+    print(f"\n💾 Exportando grafo completo a GraphML (stream, batchSize={batch_size}{', gzip' if compress else ''})...")
     query = """
         CALL apoc.export.graphml.all(null, {
             stream: true,
+            batchSize: $batch_size,
             useTypes: true,
             storeNodeIds: true
         }) YIELD data
         RETURN data;
     """
-    result = session.run(query).single()
-    graphml_data = result["data"]
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    out_file = os.path.join(EXPORT_DIR, export_path + (".gz" if compress else ""))
+    opener = gzip.open if compress else open
+
+    written = chunks = 0
+    with opener(out_file, "wt", encoding="utf-8") as f:
+        for record in session.run(query, batch_size=batch_size):
+            data = record["data"]
+            if data:
+                f.write(data)
+                written += len(data)
+                chunks += 1
 
+    print(f"✅ Grafo exportado correctamente a '{out_file}' ({chunks} lotes, {written / 1e6:.1f} MB de GraphML)")
+    return out_file
+
+def export_edge_list(session, fmt="parquet", batch_size=EXPORT_BATCH_SIZE):
+    """
+    Alternativa compacta a GraphML: lista de nodos y de aristas (Parquet o CSV),
+    escrita por lotes desde cursores de Neo4j. Las propiedades van como JSON.
+    """
     os.makedirs(EXPORT_DIR, exist_ok=True)
-    output_path = os.path.join(EXPORT_DIR, export_path)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(graphml_data)
+    print(f"\n💾 Exportando lista de nodos y aristas ({fmt})...")
+    outputs = {}
+    for name, query, schema in [
+        ("pokemon_graph_nodes", NODES_QUERY, NODE_LIST_SCHEMA),
+        ("pokemon_graph_edges", EDGES_QUERY, EDGE_LIST_SCHEMA),
+    ]:
+        path = output_path(EXPORT_DIR, name, fmt)
+        with StreamingWriter(path, schema) as writer:
+            for batch in chunked(session.run(query), batch_size):
+                writer.write([
+                    {**r.data(), "properties": json.dumps(r["properties"], ensure_ascii=False, default=str)}
+                    for r in batch
+                ])
+        print(f"✅ {path} → {writer.rows} filas")
+        outputs[name] = path
+    return outputs
 
-    print(f"✅ Grafo exportado correctamente a '{output_path}'")
+def export_graph(session, export_format="graphml", batch_size=EXPORT_BATCH_SIZE):
+    if export_format == "graphml":
+        return export_graphml(session, "pokemon_graph.graphml", batch_size)
+    if export_format == "graphml-gz":
+        return export_graphml(session, "pokemon_graph.graphml", batch_size, compress=True)
+    if export_format in ("parquet", "csv"):
+        return export_edge_list(session, export_format, batch_size)
+    return None
 
 # ───────────────────────────────────────────────
 # 🚀 SCRIPT PRINCIPAL
 # ───────────────────────────────────────────────
-def main():
+def main(keep=False, export_format="graphml"):
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    started = time.perf_counter()
 
-    with driver.session(database="neo4j") as session:
+    with driver.session(database=NEO4J_DATABASE) as session:
         print("🚀 Conectado a Neo4j — inicializando importación...")
 
-        # 1️⃣ Limpiar y crear constraints
-        print("🧹 Limpiando base y creando índices...")
-        session.run("MATCH (n) DETACH DELETE n")
-        session.run("CREATE CONSTRAINT unique_pokemon IF NOT EXISTS FOR (p:Pokemon) REQUIRE p.name IS UNIQUE")
-        session.run("CREATE CONSTRAINT unique_type IF NOT EXISTS FOR (t:Type) REQUIRE t.name IS UNIQUE")
-        session.run("CREATE CONSTRAINT unique_ability IF NOT EXISTS FOR (a:Ability) REQUIRE a.name IS UNIQUE")
-
-        # 2️⃣ Importar nodos Pokémon
-        print("📦 Cargando Pokémon...")
-        load_csv(session, "pokemon_nodes.csv", """
-            LOAD CSV WITH HEADERS FROM '{file}' AS row
-            CREATE (:Pokemon {{
-                id: toInteger(row.id),
-                name: row.name,
-                height: toInteger(row.height),
-                weight: toInteger(row.weight),
-                description: row.description,
-                generation: row.generation
-            }})
-        """)
-        check_count(session, label="Pokemon")
-
-        # 3️⃣ Importar nodos Tipo
-        print("📦 Cargando Tipos...")
-        load_csv(session, "type_nodes.csv", """
-            LOAD CSV WITH HEADERS FROM '{file}' AS row
-            CREATE (:Type {{name: row.name}})
-        """)
-        check_count(session, label="Type")
-
-        # 4️⃣ Relaciones HAS_TYPE
-        print("🔗 Creando relaciones HAS_TYPE...")
-        file_path = "file:///has_type_edges.csv"
-        query = f"""
-            LOAD CSV WITH HEADERS FROM '{file_path}' AS row
-            MATCH (p:Pokemon {{name: row.pokemon}})
-            MATCH (t:Type {{name: row.type}})
-            MERGE (p)-[:HAS_TYPE]->(t);
-        """
-        run_query(session, query)
-        check_count(session, rel_type="HAS_TYPE")
-
-        # 5️⃣ Relaciones de evolución
-        print("🔗 Creando relaciones EVOLVES_TO...")
-        load_csv(session, "evolutions_edges.csv", """
-            LOAD CSV WITH HEADERS FROM '{file}' AS row
-            MATCH (src:Pokemon {{name: row.source}})
-            MATCH (dst:Pokemon {{name: row.target}})
-            MERGE (src)-[:EVOLVES_TO]->(dst)
-        """)
-        check_count(session, rel_type="EVOLVES_TO")
-
-        # 6️⃣ Relaciones entre tipos
-        print("🔗 Creando relaciones entre Tipos (STRONG_AGAINST / WEAK_AGAINST)...")
-        file_path = "file:///type_relations_edges.csv"
-        query = f"""
-            LOAD CSV WITH HEADERS FROM '{file_path}' AS row
-            MATCH (src:Type {{name: row.source}})
-            MATCH (dst:Type {{name: row.target}})
-            WITH src, dst, row
-            CALL apoc.merge.relationship(src, row.relation, {{}}, {{}}, dst, {{}}) YIELD rel
-            RETURN count(rel);
-        """
-        run_query(session, query)
-        print("📊 Relaciones de tipo cargadas (verificar en Neo4j Browser con MATCH (:Type)-[]->(:Type))")
-
-        # 7️⃣ Relaciones de HABILIDADES
-        print("🔗 Creando relaciones CAN_HAVE (Pokémon → Ability)...")
-        load_csv(session, "abilities_edges.csv", """
-            LOAD CSV WITH HEADERS FROM '{file}' AS row
-            MATCH (p:Pokemon {{name: row.pokemon}})
-            MERGE (a:Ability {{name: row.ability}})
-            MERGE (p)-[r:CAN_HAVE]->(a)
-            SET r.hidden = toBoolean(row.is_hidden),
-                r.slot = CASE 
-                            WHEN row.slot IS NULL OR row.slot = '' THEN NULL 
-                            ELSE toInteger(row.slot)
-                        END;
-        """)
-        check_count(session, rel_type="CAN_HAVE")
+        # 1️⃣ Limpiar (por lotes) y crear constraints
+        if keep:
+            print("♻️  Modo incremental: se conservan los datos existentes (MERGE).")
+        else:
+            print("🧹 Limpiando base por lotes...")
+            delete_all(session)
+        print("🔐 Creando constraints...")
+        for q in CONSTRAINTS:
+            run_query(session, q)
+
+    # 2️⃣ Nodos (antes que las aristas: las aristas solo hacen MATCH sobre ellos)
+    print("📦 Cargando nodos (Pokémon, Tipos, Habilidades)...")
+    load_parallel(driver, [
+        ("Pokemon", iter_csv("pokemon_nodes.csv"), POKEMON_NODES),
+        ("Type", iter_csv("type_nodes.csv"), TYPE_NODES),
+        ("Ability", distinct(iter_csv("abilities_edges.csv"), "ability"), ABILITY_NODES),
+    ])
 
+    # 3️⃣ Aristas: tipos de relación independientes en sesiones paralelas
+    print("🔗 Cargando aristas (HAS_TYPE, EVOLVES_TO, STRONG_AGAINST, WEAK_AGAINST, CAN_HAVE)...")
+    load_parallel(driver, [
+        ("HAS_TYPE", iter_csv("has_type_edges.csv"), HAS_TYPE),
+        ("EVOLVES_TO", iter_csv("evolutions_edges.csv"), EVOLVES_TO),
+        ("STRONG_AGAINST", iter_csv("type_relations_edges.csv", lambda r: r["relation"] == "STRONG_AGAINST"), STRONG_AGAINST),
+        ("WEAK_AGAINST", iter_csv("type_relations_edges.csv", lambda r: r["relation"] == "WEAK_AGAINST"), WEAK_AGAINST),
+        ("CAN_HAVE", iter_csv("abilities_edges.csv"), CAN_HAVE),
+    ])
+    print(f"⏱️ Carga completa en {time.perf_counter() - started:.1f}s")
+
+    with driver.session(database=NEO4J_DATABASE) as session:
         # 🧩 Validación final automática
         print("\n🧩 Validación final del grafo:")
 
@@ -215,9 +375,8 @@ def main():
             for row in session.run(q):
                 print(dict(row))
 
-        # 💾 Exportación GraphML directa al sistema local
-        export_filename = "pokemon_graph.graphml"
-        export_graphml(session, export_filename)
+        # 💾 Exportación directa al sistema local (GraphML en streaming, o lista de nodos/aristas)
+        export_graph(session, export_format)
 
         print("\n✅ Importación y exportación completadas correctamente.\n")
 
@@ -225,4 +384,17 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Carga por lotes de data/graph/*.csv en Neo4j")
+    parser.add_argument("--keep", action="store_true", help="no borrar el grafo; MERGE incremental sobre lo existente")
+    parser.add_argument("--export", choices=["graphml", "graphml-gz", "parquet", "csv", "none"], default="graphml",
+                        help="formato de exportación al terminar la carga")
+    parser.add_argument("--export-only", action="store_true", help="solo exportar el grafo existente")
+    args = parser.parse_args()
+
+    if args.export_only:
+        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+        with driver.session(database=NEO4J_DATABASE) as session:
+            export_graph(session, args.export)
+        driver.close()
+    else:
+        main(keep=args.keep, export_format=args.export)
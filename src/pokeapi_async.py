@@ -0,0 +1,417 @@
+"""
+pokeapi_async.py
+──────────────────────────────────────────────
+Cliente asíncrono para la PokéAPI (httpx).
+- Concurrencia acotada (semáforo) y pool de conexiones keep-alive
+- Rate limiter token-bucket que respeta `Retry-After` en respuestas 429
+- Mismos reintentos/backoff que `safe_get_json` (429, 5xx, timeouts)
+- Especies y cadenas evolutivas memoizadas por URL (una descarga por corrida)
+- Caché HTTP en disco con revalidación ETag / If-Modified-Since (ver http_cache)
+- URL base configurable (POKEAPI_BASE_URL) para probar contra un stub local
+
+Uso:
+    POKEAPI_BASE_URL=http://localhost:8000/api/v2 uv run python src/ingest_pokeapi_dlt_structured.py
+──────────────────────────────────────────────
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable
+
+import httpx
+from tqdm import tqdm
+
+from http_cache import HTTPCache, get_http_cache
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                        CONFIG                              ║
+# ╚════════════════════════════════════════════════════════════╝
+
+POKEAPI_BASE_URL = os.getenv("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2").rstrip("/")
+POKEAPI_CONCURRENCY = int(os.getenv("POKEAPI_CONCURRENCY", "16"))
+POKEAPI_RATE_PER_SEC = float(os.getenv("POKEAPI_RATE_PER_SEC", "20"))
+POKEAPI_BURST = int(os.getenv("POKEAPI_BURST", "20"))
+POKEAPI_TIMEOUT = float(os.getenv("POKEAPI_TIMEOUT", "10"))
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def api_url(path: str) -> str:
+    """Resuelve rutas relativas ('pokemon/25/') contra POKEAPI_BASE_URL."""
+    if path.startswith(("http://", "https://")):
+        return path
+    return f"{POKEAPI_BASE_URL}/{path.lstrip('/')}"
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """`Retry-After` puede venir en segundos o como fecha HTTP."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                     RATE LIMITER                           ║
+# ╚════════════════════════════════════════════════════════════╝
+
+class TokenBucket:
+    """
+    Token bucket compartido por todas las tareas.
+    `pause()` bloquea el bucket completo (p.ej. tras un 429 con Retry-After).
+    """
+
+    def __init__(self, rate: float = POKEAPI_RATE_PER_SEC, capacity: int = POKEAPI_BURST):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                     CLIENTE HTTP                           ║
+# ╚════════════════════════════════════════════════════════════╝
+
+class PokeAPIClient:
+    """
+    Uso:
+        async with PokeAPIClient() as api:
+            pokemon = await api.get_json("pokemon/25/")
+    `transport` permite inyectar httpx.MockTransport en pruebas.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = POKEAPI_CONCURRENCY,
+        rate_per_sec: float = POKEAPI_RATE_PER_SEC,
+        burst: int = POKEAPI_BURST,
+        timeout: float = POKEAPI_TIMEOUT,
+        retries: int = 5,
+        backoff_factor: float = 1.5,
+        transport: httpx.AsyncBaseTransport | None = None,
+        cache: HTTPCache | None = None,
+    ):
+        self.concurrency = concurrency
+        self.cache = cache or get_http_cache()
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            headers={"User-Agent": "g-poke-t/0.1 (+pokeapi ingestion)"},
+            transport=transport,
+        )
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "failed": 0, "cache_hits": 0, "not_modified": 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_factor ** attempt + random.random()
+
+    async def get_json(self, url: str) -> dict | None:
+        """Equivalente asíncrono de `safe_get_json` (maneja 429, 5xx, timeouts)."""
+        url = api_url(url)
+        # SQLite + zlib del caché son bloqueantes: fuera del event loop
+        entry, usable = await asyncio.to_thread(self.cache.get_fresh, url)
+        if usable:
+            self.stats["cache_hits"] += 1
+            return json.loads(entry.body)
+        if self.cache.offline:
+            print(f"📴 Sin caché para {url} (modo offline)")
+            self.stats["failed"] += 1
+            return None
+
+        for attempt in range(self.retries):
+            await self.bucket.acquire()
+            try:
+                async with self.semaphore:
+                    self.stats["requests"] += 1
+                    resp = await self.client.get(url, headers=self.cache.conditional_headers(entry))
+                if resp.status_code == 304 and entry is not None:
+                    self.stats["not_modified"] += 1
+                    await asyncio.to_thread(self.cache.revalidated, url, resp.headers)
+                    return json.loads(entry.body)
+                if resp.status_code == 200:
+                    await asyncio.to_thread(self.cache.store, url, resp.content, resp.headers)
+                    return resp.json()
+                elif resp.status_code in RETRY_STATUS:
+                    wait = self._backoff(attempt)
+                    if resp.status_code == 429:
+                        self.stats["rate_limited"] += 1
+                        retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                        if retry_after is not None:
+                            wait = retry_after
+                        self.bucket.pause(wait)
+                    self.stats["retries"] += 1
+                    print(f"⚠️ {resp.status_code} en {url}, reintentando en {wait:.1f}s...")
+                    await asyncio.sleep(wait)
+                else:
+                    print(f"❌ Error {resp.status_code} en {url}")
+                    self.stats["failed"] += 1
+                    return None
+            except httpx.HTTPError as e:
+                wait = self._backoff(attempt)
+                self.stats["retries"] += 1
+                print(f"⚠️ Excepción {e!r}, reintentando en {wait:.1f}s...")
+                await asyncio.sleep(wait)
+
+        print(f"❌ Falló definitivamente: {url}")
+        self.stats["failed"] += 1
+        return None
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                  PARSEO DE RESPUESTAS                      ║
+# ╚════════════════════════════════════════════════════════════╝
+
+def parse_species(species: dict | None) -> dict:
+    """Descripción (en), generación y URL de cadena evolutiva."""
+    if not species:
+        return {"description": None, "generation": None, "evolution_chain_url": None}
+
+    description = next(
+        (
+            entry["flavor_text"].replace("\n", " ").replace("\f", " ")
+            for entry in species.get("flavor_text_entries", [])
+            if entry.get("language", {}).get("name") == "en"
+        ),
+        None,
+    )
+    return {
+        "description": description,
+        "generation": species.get("generation", {}).get("name"),
+        "evolution_chain_url": species.get("evolution_chain", {}).get("url"),
+    }
+
+
+def parse_evolution_pairs(evo_data: dict | None) -> list[tuple[str, str]]:
+    """Pares (source, target) de una cadena evolutiva."""
+    if not evo_data:
+        return []
+
+    pairs = []
+
+    def traverse(node):
+        src = node["species"]["name"]
+        for nxt in node.get("evolves_to", []):
+            dst = nxt["species"]["name"]
+            pairs.append((src, dst))
+            traverse(nxt)
+
+    traverse(evo_data["chain"])
+    return pairs
+
+
+def build_record(pokemon: dict, species_data: dict) -> dict:
+    return {
+        "id": pokemon["id"],
+        "name": pokemon["name"],
+        "species_name": pokemon["species"]["name"],
+        "types": pokemon["types"],
+        "abilities": pokemon["abilities"],
+        "stats": pokemon["stats"],
+        "height": pokemon["height"],
+        "weight": pokemon["weight"],
+        "species": species_data,
+    }
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║               RESOLVER MEMOIZADO (POR URL)                 ║
+# ╚════════════════════════════════════════════════════════════╝
+
+class MemoizedResolver:
+    """
+    Descarga + parseo memoizado por URL, con coalescencia de requests en vuelo:
+    si Ivysaur pide la cadena evolutiva mientras la de Bulbasaur sigue descargándose,
+    ambos esperan la misma tarea. Cada URL se pide exactamente una vez por corrida.
+    Se guarda el valor parseado (no el JSON completo) para acotar memoria.
+    """
+
+    def __init__(self, api: PokeAPIClient, parse: Callable[[dict | None], Any]):
+        self.api = api
+        self.parse = parse
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.fetched = 0
+        self.saved = 0
+
+    async def _fetch(self, url: str):
+        return self.parse(await self.api.get_json(url))
+
+    async def resolve(self, url: str):
+        url = api_url(url)
+        task = self._tasks.get(url)
+        if task is None:
+            self.fetched += 1
+            task = self._tasks[url] = asyncio.create_task(self._fetch(url))
+        else:
+            self.saved += 1
+        # shield: cancelar a un consumidor no cancela la descarga compartida
+        return await asyncio.shield(task)
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                    INGESTA CONCURRENTE                     ║
+# ╚════════════════════════════════════════════════════════════╝
+
+async def fetch_pokemon_entry(
+    api: PokeAPIClient,
+    url: str,
+    species: MemoizedResolver | None = None,
+    chains: MemoizedResolver | None = None,
+) -> tuple[dict | None, list[tuple[str, str]]]:
+    """Pokémon → especie → cadena evolutiva (secuencial por entrada, concurrente entre entradas)."""
+    species = species or MemoizedResolver(api, parse_species)
+    chains = chains or MemoizedResolver(api, parse_evolution_pairs)
+
+    pokemon = await api.get_json(url)
+    if not pokemon:
+        return None, []
+
+    # ✅ species_url como fallback para variantes con IDs especiales (>=10000)
+    species_data = dict(await species.resolve(pokemon["species"]["url"]))
+    evo_url = species_data.get("evolution_chain_url")
+    pairs = list(await chains.resolve(evo_url)) if evo_url else []
+    return build_record(pokemon, species_data), pairs
+
+
+async def ingest_all(
+    limit_per_page: int = 100,
+    start_offset: int = 0,
+    save_every: int = 100,
+    on_batch: Callable[[list, list, int], None] | None = None,
+    api: PokeAPIClient | None = None,
+) -> dict:
+    """
+    Pagina /pokemon y descarga cada página en paralelo.
+    `on_batch(records, evo_pairs, batch_number)` recibe bloques de `save_every` Pokémon
+    (mismo orden y numeración que la versión secuencial).
+    """
+    own_client = api is None
+    api = api or PokeAPIClient()
+    species = MemoizedResolver(api, parse_species)
+    chains = MemoizedResolver(api, parse_evolution_pairs)
+    started = time.perf_counter()
+    all_records, all_pairs = [], []
+    batch_counter = start_offset // limit_per_page + 1
+    total = 0
+
+    try:
+        page_url = api_url(f"pokemon?limit={limit_per_page}&offset={start_offset}")
+        while page_url:
+            resp = await api.get_json(page_url)
+            if not resp:
+                print(f"⚠️ No se pudo obtener {page_url}, deteniendo paginación.")
+                break
+
+            entries = resp.get("results", [])
+            tasks = [asyncio.create_task(fetch_pokemon_entry(api, e["url"], species, chains)) for e in entries]
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc=f"Fetching Pokémon batch {batch_counter}"):
+                await task
+            results = [t.result() for t in tasks]  # orden original de la página
+
+            for record, pairs in results:
+                if record is None:
+                    continue
+                all_records.append(record)
+                all_pairs.extend(pairs)
+                total += 1
+                if len(all_records) >= save_every:
+                    if on_batch:
+                        on_batch(list(all_records), list(all_pairs), batch_counter)
+                    all_records.clear()
+                    all_pairs.clear()
+                    batch_counter += 1
+
+            page_url = resp.get("next")
+
+        if all_records and on_batch:
+            on_batch(list(all_records), list(all_pairs), batch_counter)
+    finally:
+        if own_client:
+            await api.aclose()
+
+    elapsed = time.perf_counter() - started
+    saved = species.saved + chains.saved
+    summary = {
+        "pokemon": total,
+        "elapsed_sec": round(elapsed, 1),
+        "species_fetched": species.fetched,
+        "chains_fetched": chains.fetched,
+        "requests_saved": saved,
+        **api.stats,
+    }
+    print(f"⏱️ {total} Pokémon en {elapsed:.1f}s — {api.stats['requests']} requests, "
+          f"{api.stats['retries']} reintentos, {api.stats['rate_limited']} respuestas 429, "
+          f"{api.stats['cache_hits']} desde caché, {api.stats['not_modified']} revalidados (304).")
+    print(f"♻️ Especies únicas: {species.fetched}, cadenas únicas: {chains.fetched} — "
+          f"{saved} requests ahorrados por memoización.")
+    return summary
+
+
+async def fetch_type_relations(api: PokeAPIClient | None = None) -> list[dict]:
+    """Tabla de ventajas/desventajas entre tipos, con los tipos descargados en paralelo."""
+    own_client = api is None
+    api = api or PokeAPIClient()
+    relations = []
+    try:
+        types_list = await api.get_json("type/")
+        if not types_list:
+            return relations
+
+        type_data = await asyncio.gather(*(api.get_json(t["url"]) for t in types_list.get("results", [])))
+        for tdata in type_data:
+            if not tdata:
+                continue
+            name = tdata["name"]
+            dr = tdata.get("damage_relations", {})
+            for rel in dr.get("double_damage_to", []):
+                relations.append({"source": name, "relation": "STRONG_AGAINST", "target": rel["name"]})
+            for rel in dr.get("double_damage_from", []):
+                relations.append({"source": name, "relation": "WEAK_AGAINST", "target": rel["name"]})
+    finally:
+        if own_client:
+            await api.aclose()
+    return relations
@@ -0,0 +1,212 @@
+"""
+pokedex_io.py
+──────────────────────────────────────────────
+Esquemas Arrow tipados y E/S columnar (Parquet) para los datasets intermedios:
+batches de ingesta, consolidado y aplanado.
+
+- Campos anidados (types, abilities, stats, species) con tipos reales:
+  sin `repr()` en CSV ni `ast.literal_eval` al leer
+- Lecturas en streaming por record batches con proyección de columnas
+- Fallback a CSV (PIPELINE_FORMAT=csv o archivos .csv existentes)
+──────────────────────────────────────────────
+"""
+
+import os
+import ast
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                         CONFIG                             ║
+# ╚════════════════════════════════════════════════════════════╝
+
+PIPELINE_FORMAT = os.getenv("PIPELINE_FORMAT", "parquet").lower()  # parquet | csv
+BATCH_ROWS = int(os.getenv("PIPELINE_BATCH_ROWS", "1000"))
+
+NESTED_FIELDS = ["types", "abilities", "stats", "species"]
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                        ESQUEMAS                            ║
+# ╚════════════════════════════════════════════════════════════╝
+
+NAMED_RESOURCE = pa.struct([("name", pa.string()), ("url", pa.string())])
+
+POKEDEX_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("name", pa.string()),
+    ("species_name", pa.string()),
+    ("types", pa.list_(pa.struct([("slot", pa.int32()), ("type", NAMED_RESOURCE)]))),
+    ("abilities", pa.list_(pa.struct([
+        ("ability", NAMED_RESOURCE),
+        ("is_hidden", pa.bool_()),
+        ("slot", pa.int32()),
+    ]))),
+    ("stats", pa.list_(pa.struct([
+        ("base_stat", pa.int32()),
+        ("effort", pa.int32()),
+        ("stat", NAMED_RESOURCE),
+    ]))),
+    ("height", pa.int64()),
+    ("weight", pa.int64()),
+    ("species", pa.struct([
+        ("description", pa.string()),
+        ("generation", pa.string()),
+        ("evolution_chain_url", pa.string()),
+    ])),
+])
+
+EVOLUTIONS_SCHEMA = pa.schema([("source", pa.string()), ("target", pa.string())])
+
+TYPE_RELATIONS_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("relation", pa.string()),
+    ("target", pa.string()),
+])
+
+STAT_NAMES = ["hp", "attack", "defense", "special-attack", "special-defense", "speed"]
+
+FLAT_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("name", pa.string()),
+        ("species_name", pa.string()),
+        ("type_names", pa.string()),
+        ("ability_names", pa.string()),
+    ]
+    + [(s, pa.int32()) for s in STAT_NAMES]
+    + [
+        ("height", pa.int64()),
+        ("weight", pa.int64()),
+        ("generation", pa.string()),
+        ("description", pa.string()),
+    ]
+)
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                       ESCRITURA                            ║
+# ╚════════════════════════════════════════════════════════════╝
+
+def output_path(base: Path | str, stem: str, fmt: str = PIPELINE_FORMAT) -> Path:
+    return Path(base) / f"{stem}.{'csv' if fmt == 'csv' else 'parquet'}"
+
+
+def write_table(data: List[dict] | pd.DataFrame, path: Path | str, schema: pa.Schema):
+    """Escribe registros con el esquema tipado (.parquet) o como CSV (.csv)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".csv":
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data, columns=schema.names)
+        df.to_csv(path, index=False)
+        return
+    if isinstance(data, pd.DataFrame):
+        table = pa.Table.from_pandas(data[schema.names], schema=schema, preserve_index=False)
+    else:
+        table = pa.Table.from_pylist(data, schema=schema)
+    pq.write_table(table, path)
+
+
+class StreamingWriter:
+    """Escritura incremental (record batch a record batch) en Parquet o CSV."""
+
+    def __init__(self, path: Path | str, schema: pa.Schema):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.schema = schema
+        self.rows = 0
+        self._writer = None if self.path.suffix == ".csv" else pq.ParquetWriter(self.path, schema)
+        self._csv_header = True
+
+    def write(self, batch: pa.RecordBatch | List[dict]):
+        if isinstance(batch, list):
+            if not batch:
+                return
+            batch = pa.RecordBatch.from_pylist(batch, schema=self.schema)
+        if batch.num_rows == 0:
+            return
+        if self._writer is not None:
+            self._writer.write_batch(batch.select(self.schema.names).cast(self.schema))
+        else:
+            # to_pylist mantiene listas/dicts de Python (mismo repr que los CSV heredados)
+            df = pd.DataFrame(batch.to_pylist(), columns=self.schema.names)
+            df.to_csv(self.path, mode="w" if self._csv_header else "a", header=self._csv_header, index=False)
+            self._csv_header = False
+        self.rows += batch.num_rows
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        elif self._csv_header:
+            pd.DataFrame(columns=self.schema.names).to_csv(self.path, index=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ╔════════════════════════════════════════════════════════════╗
+# ║                        LECTURA                             ║
+# ╚════════════════════════════════════════════════════════════╝
+
+def find_table(base: Path | str, stem: str) -> Path:
+    """Prefiere <stem>.parquet; usa <stem>.csv como fallback (datos de corridas previas)."""
+    for suffix in (".parquet", ".csv"):
+        path = Path(base) / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"❌ No se encontró {stem}.parquet ni {stem}.csv en {base}")
+
+
+def _parse_nested(val):
+    if not isinstance(val, str):
+        return None if pd.isna(val) else val
+    try:
+        return ast.literal_eval(val)
+    except Exception:
+        return None
+
+
+def iter_batches(
+    paths: Iterable[Path | str] | Path | str,
+    columns: List[str] | None = None,
+    batch_size: int = BATCH_ROWS,
+    schema: pa.Schema | None = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Record batches de uno o varios archivos, leyendo solo `columns`.
+    Los CSV heredados (campos anidados como repr de Python) se convierten en el vuelo;
+    con `schema` quedan tipados igual que el Parquet.
+    """
+    if schema is not None and columns:
+        schema = pa.schema([schema.field(c) for c in columns])
+    paths = [Path(paths)] if isinstance(paths, (str, Path)) else [Path(p) for p in paths]
+    # Un archivo a la vez, en el orden recibido (el lector cambia según la extensión)
+    for path in paths:
+        if path.suffix == ".parquet":
+            yield from ds.dataset(str(path), format="parquet").to_batches(columns=columns, batch_size=batch_size)
+            continue
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=batch_size):
+            for col in NESTED_FIELDS:
+                if col in chunk.columns:
+                    chunk[col] = chunk[col].map(_parse_nested)
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            yield pa.RecordBatch.from_pylist(chunk.to_dict(orient="records"), schema=schema)
+
+
+def iter_records(
+    paths,
+    columns: List[str] | None = None,
+    batch_size: int = BATCH_ROWS,
+    schema: pa.Schema | None = None,
+) -> Iterator[List[dict]]:
+    """Como iter_batches, pero entrega listas de dicts (listas para insert_many / bulk_write)."""
+    for batch in iter_batches(paths, columns=columns, batch_size=batch_size, schema=schema):
+        yield batch.to_pylist()
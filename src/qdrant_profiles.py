@@ -0,0 +1,276 @@
+"""
+qdrant_profiles.py
+──────────────────────────────────────────────
+Storage / quantization profiles for the hybrid Qdrant collection.
+- default → float32 vectors + HNSW in RAM (previous behaviour)
+- int8    → scalar int8 quantization in RAM, originals on disk, rescoring
+- binary  → binary quantization in RAM, originals on disk, oversampling + rescoring
+- disk    → no quantization; vectors, HNSW graph and sparse index on disk
+
+QDRANT_PROFILE picks the profile for indexing; search reads it back from the
+live collection (profile_for_collection). QDRANT_HNSW_M / QDRANT_HNSW_EF_CONSTRUCT / QDRANT_HNSW_EF override its HNSW knobs.
+
+Usage:
+    uv run python src/qdrant_profiles.py list
+    uv run python src/qdrant_profiles.py bench --profiles default,int8,binary --k 10 --queries 100
+──────────────────────────────────────────────
+"""
+
+import os
+import time
+import random
+import argparse
+import statistics
+from dataclasses import asdict, dataclass, replace
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+# ───────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "pokedex-key")
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "pokedex_hybrid")
+QDRANT_PROFILE = os.getenv("QDRANT_PROFILE", "default")
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    name: str
+    quantization: str | None = None   # None | "int8" | "binary"
+    on_disk: bool = False             # original float32 vectors on disk
+    hnsw_on_disk: bool = False
+    sparse_on_disk: bool = False
+    m: int = 16
+    ef_construct: int = 100
+    ef: int = 128                     # search-time hnsw_ef
+    oversampling: float = 1.0
+    rescore: bool = True
+
+    # ── collection creation ──────────────────────
+    def quantization_config(self):
+        if self.quantization == "int8":
+            return qmodels.ScalarQuantization(
+                scalar=qmodels.ScalarQuantizationConfig(type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return qmodels.BinaryQuantization(binary=qmodels.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def collection_config(self, dense_dim: int) -> dict:
+        """kwargs for client.create_collection (dense 'jina-small' + sparse 'bm25')."""
+        return {
+            "vectors_config": {
+                "jina-small": qmodels.VectorParams(
+                    size=dense_dim,
+                    distance=qmodels.Distance.COSINE,
+                    on_disk=self.on_disk,
+                    quantization_config=self.quantization_config(),
+                ),
+            },
+            "sparse_vectors_config": {
+                "bm25": qmodels.SparseVectorParams(
+                    modifier=qmodels.Modifier.IDF,
+                    index=qmodels.SparseIndexParams(on_disk=self.sparse_on_disk),
+                ),
+            },
+            "hnsw_config": qmodels.HnswConfigDiff(m=self.m, ef_construct=self.ef_construct, on_disk=self.hnsw_on_disk),
+        }
+
+    # ── search ───────────────────────────────────
+    def search_params(self, exact: bool = False) -> qmodels.SearchParams:
+        if exact:
+            return qmodels.SearchParams(exact=True)
+        quantization = None
+        if self.quantization:
+            quantization = qmodels.QuantizationSearchParams(
+                ignore=False, rescore=self.rescore, oversampling=self.oversampling
+            )
+        return qmodels.SearchParams(hnsw_ef=self.ef, quantization=quantization)
+
+    # ── sizing ───────────────────────────────────
+    def estimate_memory(self, points: int, dense_dim: int) -> dict:
+        """
+        Estimated RAM / disk footprint of the dense subspace (MB), computed from
+        Qdrant's sizing guide (float32 originals ×1.5 overhead, HNSW links ≈ m·2
+        ids per point) — a formula, not a measurement of the running server.
+        """
+        original = points * dense_dim * 4 * 1.5
+        quantized = {"int8": points * dense_dim, "binary": points * dense_dim / 8}.get(self.quantization, 0)
+        graph = points * self.m * 2 * 4
+        ram = quantized + (0 if self.on_disk else original) + (0 if self.hnsw_on_disk else graph)
+        disk = original + quantized + graph
+        return {"est_ram_mb": round(ram / 2**20, 2), "est_disk_mb": round(disk / 2**20, 2)}
+
+
+PROFILES = {
+    "default": CollectionProfile("default"),
+    "int8": CollectionProfile("int8", quantization="int8", on_disk=True, oversampling=1.5),
+    "binary": CollectionProfile("binary", quantization="binary", on_disk=True, oversampling=3.0),
+    "disk": CollectionProfile("disk", on_disk=True, hnsw_on_disk=True, sparse_on_disk=True),
+}
+
+
+def get_profile(name: str | None = None) -> CollectionProfile:
+    """Named profile with QDRANT_HNSW_* environment overrides applied."""
+    name = name or QDRANT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"❌ Unknown Qdrant profile '{name}' (choose from {', '.join(PROFILES)})")
+    overrides = {
+        field: int(os.environ[env])
+        for field, env in [("m", "QDRANT_HNSW_M"), ("ef_construct", "QDRANT_HNSW_EF_CONSTRUCT"), ("ef", "QDRANT_HNSW_EF")]
+        if os.getenv(env)
+    }
+    return replace(PROFILES[name], **overrides)
+
+
+def profile_for_collection(info) -> CollectionProfile:
+    """
+    Profile matching a live collection (client.get_collection), so search
+    params follow what was actually built rather than the current QDRANT_PROFILE.
+    """
+    dense = info.config.params.vectors["jina-small"]
+    quantization = dense.quantization_config or info.config.quantization_config
+    hnsw = info.config.hnsw_config
+    if isinstance(quantization, qmodels.ScalarQuantization):
+        name = "int8"
+    elif isinstance(quantization, qmodels.BinaryQuantization):
+        name = "binary"
+    else:
+        name = "disk" if hnsw.on_disk else "default"
+    return replace(
+        get_profile(name),
+        on_disk=bool(dense.on_disk),
+        hnsw_on_disk=bool(hnsw.on_disk),
+        m=hnsw.m,
+        ef_construct=hnsw.ef_construct,
+    )
+
+
+# ───────────────────────────────────────────────
+# BENCHMARK
+# ───────────────────────────────────────────────
+def scroll_points(client, collection, page_size=256):
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection, limit=page_size, offset=offset, with_payload=False, with_vectors=True
+        )
+        yield from points
+        if offset is None:
+            return
+
+def wait_until_indexed(client, collection, timeout=600):
+    deadline = time.time() + timeout
+    while client.get_collection(collection).status != qmodels.CollectionStatus.GREEN:
+        if time.time() > deadline:
+            raise TimeoutError(f"❌ '{collection}' still optimizing after {timeout}s")
+        time.sleep(0.5)
+
+def dense_search(client, collection, vector, k, params, exclude=None):
+    """Top-k point ids; `exclude` (the query's own point) is dropped so it cannot count as a hit."""
+    ids = [
+        p.id
+        for p in client.query_points(
+            collection_name=collection, query=vector, using="jina-small", limit=k + 1, search_params=params
+        ).points
+    ]
+    return [i for i in ids if i != exclude][:k]
+
+def benchmark_profile(client, source, profile, queries, truth, k, dense_dim, keep=False):
+    """Copies `source` into a profile-specific collection and measures recall@k, latency and memory."""
+    target = f"{source}__bench_{profile.name}"
+    if client.collection_exists(target):
+        client.delete_collection(target)
+    client.create_collection(
+        collection_name=target,
+        # indexing_threshold=1 KB forces an HNSW graph even on a small corpus
+        optimizers_config=qmodels.OptimizersConfigDiff(indexing_threshold=1),
+        **profile.collection_config(dense_dim),
+    )
+    started = time.perf_counter()
+    client.upload_points(
+        collection_name=target,
+        points=(qmodels.PointStruct(id=p.id, vector=p.vector) for p in scroll_points(client, source)),
+        batch_size=256,
+        wait=True,
+    )
+    wait_until_indexed(client, target)
+    build_sec = time.perf_counter() - started
+
+    params = profile.search_params()
+    latencies, recalls = [], []
+    for (point_id, vector), expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        found = dense_search(client, target, vector, k, params, exclude=point_id)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len(set(found) & set(expected)) / max(len(expected), 1))
+
+    points = client.count(target, exact=True).count
+    if not keep:
+        client.delete_collection(target)
+    latencies.sort()
+    return {
+        "profile": profile.name,
+        f"recall@{k}": round(statistics.mean(recalls), 4),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "build_sec": round(build_sec, 1),
+        "points": points,
+        **profile.estimate_memory(points, dense_dim),
+    }
+
+def benchmark(client, source, profile_names, k=10, n_queries=100, keep=False, seed=7):
+    """
+    Recall@k of each profile's approximate dense search against exact search
+    (SearchParams(exact=True) over the float32 originals) on `source`.
+    Queries are stored chunk vectors sampled from the collection; each query's
+    own point is excluded from both the exact and approximate results.
+    Memory columns are estimates (see CollectionProfile.estimate_memory).
+    """
+    sample = [p for p in scroll_points(client, source)]
+    if not sample:
+        raise RuntimeError(f"❌ Collection '{source}' is empty")
+    random.Random(seed).shuffle(sample)
+    queries = [(p.id, p.vector["jina-small"]) for p in sample[:n_queries]]
+    dense_dim = len(queries[0][1])
+    exact = qmodels.SearchParams(exact=True)
+    truth = [dense_search(client, source, v, k, exact, exclude=point_id) for point_id, v in queries]
+
+    rows = []
+    for name in profile_names:
+        print(f"⏱️  Benchmarking profile '{name}'...")
+        rows.append(benchmark_profile(client, source, get_profile(name), queries, truth, k, dense_dim, keep))
+    return rows
+
+def print_table(rows):
+    headers = list(rows[0])
+    widths = [max(len(h), *(len(str(r[h])) for r in rows)) for h in headers]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for r in rows:
+        print("  ".join(str(r[h]).ljust(w) for h, w in zip(headers, widths)))
+
+
+# ───────────────────────────────────────────────
+# MAIN
+# ───────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Qdrant collection profiles and recall/latency/memory benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    bench = sub.add_parser("bench")
+    bench.add_argument("--collection", default=COLLECTION_NAME, help="source collection or alias")
+    bench.add_argument("--profiles", default=",".join(PROFILES))
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--queries", type=int, default=100)
+    bench.add_argument("--keep", action="store_true", help="keep the benchmark collections")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name in PROFILES:
+            print(asdict(get_profile(name)))
+    else:
+        client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+        rows = benchmark(client, args.collection, args.profiles.split(","), args.k, args.queries, args.keep)
+        print_table(rows)
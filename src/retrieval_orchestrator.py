@@ -0,0 +1,292 @@
+"""
+retrieval_orchestrator.py
+──────────────────────────────────────────────
+Concurrent multi-store retrieval (Qdrant + MongoDB + Neo4j) for Pokémon RAG system.
+──────────────────────────────────────────────
+"""
+
+import os
+import re
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List
+
+from hybrid_search_qdrant import hybrid_rrf_search
+from mongo_query import lookup_factual
+from graph_query import query_relational_many, graph_name, SUPPORTED_RELATIONS
+
+# ───────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────
+MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "8"))
+
+# Per-stage deadlines (seconds), measured from the start of the retrieval phase
+DEFAULT_DEADLINES = {
+    "semantic": float(os.getenv("RETRIEVAL_DEADLINE_SEMANTIC", "3.0")),
+    "factual": float(os.getenv("RETRIEVAL_DEADLINE_FACTUAL", "2.0")),
+    "graph": float(os.getenv("RETRIEVAL_DEADLINE_GRAPH", "2.0")),
+}
+
+# Speculative mode: start retrieval before the IntentRouter returns
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "1") == "1"
+MAX_SPECULATIVE_ENTITIES = int(os.getenv("MAX_SPECULATIVE_ENTITIES", "3"))
+
+# Shared, bounded pool: concurrent users never open more than MAX_WORKERS backend calls
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="retrieval")
+
+
+# ───────────────────────────────────────────────
+# STAGES
+# ───────────────────────────────────────────────
+def intents_of_type(intents_output: Dict[str, Any] | None, intent_type: str) -> List[Dict]:
+    """Return the intents of a given type from the IntentRouter output."""
+    if not intents_output:
+        return []
+    return [i for i in intents_output.get("intents", []) if i.get("type") == intent_type]
+
+
+def semantic_stage(qdrant_client, query: str, limit: int) -> List[Any]:
+    return list(hybrid_rrf_search(client=qdrant_client, query=query, limit=limit))
+
+
+def factual_stage(intents: List[Dict]) -> List[Dict]:
+    if not intents:
+        return []
+    return lookup_factual(intents)
+
+
+def graph_stage(intents: List[Dict]) -> List[Dict]:
+    if not intents:
+        return []
+    return query_relational_many(intents)
+
+
+def _timed(fn: Callable, *args) -> tuple[Any, float]:
+    """Run a stage and return (result, elapsed seconds measured inside the worker)."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def submit_stage(fn: Callable, *args):
+    """Schedule a stage on the shared retrieval pool (the caller's trace context follows it)."""
+    ctx = contextvars.copy_context()
+    return _executor.submit(ctx.run, _timed, fn, *args)
+
+
+def collect_stages(futures: Dict[str, Any], started: float, deadlines: Dict[str, float] | None = None) -> Dict[str, Any]:
+    """
+    Wait for every scheduled stage until its deadline.
+    Stages that time out or fail contribute an empty result and an entry in `errors`.
+    """
+    deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+    merged = {"timings": {}, "errors": {}}
+
+    for stage, future in futures.items():
+        remaining = max(0.0, deadlines.get(stage, 0.0) - (time.perf_counter() - started))
+        try:
+            result, elapsed = future.result(timeout=remaining)
+            merged[stage] = result
+            merged["timings"][stage] = elapsed
+        except FutureTimeout:
+            future.cancel()
+            merged[stage] = []
+            merged["timings"][stage] = deadlines.get(stage)
+            merged["errors"][stage] = f"deadline of {deadlines.get(stage)}s exceeded"
+        except Exception as e:
+            print(f"⚠️ Retrieval stage '{stage}' failed: {e}")
+            merged[stage] = []
+            merged["errors"][stage] = str(e)
+
+    return merged
+
+
+# ───────────────────────────────────────────────
+# ORCHESTRATOR
+# ───────────────────────────────────────────────
+def retrieve_context(
+    query: str,
+    intents_output: Dict[str, Any] | None,
+    qdrant_client,
+    limit: int = 3,
+    deadlines: Dict[str, float] | None = None,
+) -> Dict[str, Any]:
+    """
+    Run Qdrant, MongoDB and Neo4j retrieval concurrently for one user question.
+
+    Returns a merged context dict:
+    {
+      "query": ..., "intents": ...,
+      "semantic": [...], "factual": [...], "graph": [...],
+      "timings": {stage: sec}, "errors": {stage: msg}, "elapsed_sec": ...
+    }
+    """
+    started = time.perf_counter()
+    futures = {
+        "semantic": submit_stage(semantic_stage, qdrant_client, query, limit),
+        "factual": submit_stage(factual_stage, intents_of_type(intents_output, "factual")),
+        "graph": submit_stage(graph_stage, intents_of_type(intents_output, "relational")),
+    }
+
+    context = {"query": query, "intents": intents_output}
+    context.update(collect_stages(futures, started, deadlines))
+    context["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    return context
+
+
+# ───────────────────────────────────────────────
+# SPECULATIVE RETRIEVAL
+# ───────────────────────────────────────────────
+# Attributes prefetched for every candidate entity; results are narrowed once intents arrive
+SPECULATIVE_FACTUAL_ATTRIBUTES = ["type", "ability", "stat", "category"]
+SPECULATIVE_RELATIONAL_ATTRIBUTES = SUPPORTED_RELATIONS
+
+# Intent attribute → key in the lookup_factual result
+FACTUAL_ATTRIBUTE_KEYS = {"type": "type", "ability": "abilities", "stat": "stats", "category": "category"}
+
+STOPWORDS = {
+    # English
+    "what", "which", "how", "does", "do", "did", "is", "are", "was", "the", "and", "or", "a", "an",
+    "of", "to", "in", "on", "for", "with", "about", "into", "from", "at", "by", "its", "it",
+    "why", "who", "when", "where", "can", "could", "should", "would", "will", "than", "that",
+    "this", "these", "those", "me", "tell", "explain", "compare", "between", "best", "better",
+    "more", "most", "good", "bad", "pokemon", "pokémon", "type", "types", "evolve", "evolves",
+    "evolution", "evolutions", "strong", "weak", "against", "ability", "abilities", "stat",
+    "stats", "category", "has", "have", "learn", "level", "use", "using", "vs", "versus",
+    # Spanish
+    "que", "qué", "cual", "cuál", "cuales", "cuáles", "como", "cómo", "por", "para", "con",
+    "el", "la", "los", "las", "un", "una", "de", "del", "en", "es", "son", "y", "o", "se",
+    "su", "sus", "tipo", "tipos", "evoluciona", "evolución", "evoluciones", "contra", "fuerte",
+    "fuertes", "debil", "débil", "débiles", "habilidad", "habilidades", "estadísticas",
+    "mejor", "entre", "cuando", "cuándo", "dónde", "donde", "quien", "quién", "explica",
+}
+
+
+def detect_entities(query: str, max_entities: int = MAX_SPECULATIVE_ENTITIES) -> List[str]:
+    """
+    Cheap candidate entity detection on the raw query (no LLM).
+    Keeps non-stopword tokens, preferring capitalized words (likely proper names).
+    """
+    tokens = re.findall(r"[A-Za-zÀ-ÿ][A-Za-zÀ-ÿ'\-\.]*[A-Za-zÀ-ÿ]", query)
+    candidates = []
+    for tok in tokens:
+        if tok.lower() in STOPWORDS or tok.lower() in (c.lower() for c in candidates):
+            continue
+        candidates.append(tok)
+
+    candidates.sort(key=lambda t: not t[0].isupper())  # stable: capitalized first
+    return candidates[:max_entities]
+
+
+def _project_factual(result: Dict, attributes: List[str]) -> Dict:
+    """Narrow a prefetched factual result to the attributes requested by the intent."""
+    full = result.get("attributes", {})
+    keys = [FACTUAL_ATTRIBUTE_KEYS[a] for a in attributes if a in FACTUAL_ATTRIBUTE_KEYS]
+    if not keys:
+        keys = ["type", "abilities", "category"]
+    return {**result, "attributes": {k: full.get(k) for k in keys if k in full}}
+
+
+class SpeculativeRetrieval:
+    """
+    Starts Qdrant search plus Mongo/Neo4j prefetches for cheaply detected entities
+    as soon as the question arrives, so retrieval overlaps with LLM intent extraction.
+    Call `resolve(intents_output)` once the IntentRouter returns.
+    """
+
+    def __init__(self, query: str, qdrant_client, limit: int = 3, entity_detector: Callable = detect_entities):
+        self.query = query
+        self.entities = entity_detector(query)
+        self.started = time.perf_counter()
+
+        self.futures = {"semantic": submit_stage(semantic_stage, qdrant_client, query, limit)}
+        if self.entities:
+            self.futures["factual"] = submit_stage(factual_stage, [
+                {"type": "factual", "entity": e, "attributes": SPECULATIVE_FACTUAL_ATTRIBUTES}
+                for e in self.entities
+            ])
+            self.futures["graph"] = submit_stage(graph_stage, [
+                {"type": "relational", "entity": e, "attributes": SPECULATIVE_RELATIONAL_ATTRIBUTES}
+                for e in self.entities
+            ])
+
+    def cancel(self):
+        """Drop every speculative stage (e.g. when intent extraction fails)."""
+        for future in self.futures.values():
+            future.cancel()
+
+    def resolve(self, intents_output: Dict[str, Any] | None, deadlines: Dict[str, float] | None = None) -> Dict[str, Any]:
+        """
+        Keep the speculative results that match the router intents, cancel the rest,
+        and run regular lookups only for the entities that were not prefetched.
+        Returns the same merged context shape as `retrieve_context`.
+        """
+        resolve_start = time.perf_counter()
+        prefetched = {e.lower() for e in self.entities}
+        factual_intents = intents_of_type(intents_output, "factual")
+        relational_intents = intents_of_type(intents_output, "relational")
+
+        factual_hits = [i for i in factual_intents if (i.get("entity") or "").lower() in prefetched]
+        factual_misses = [i for i in factual_intents if i not in factual_hits]
+        prefetched_graph = {graph_name(e) for e in self.entities}
+        graph_hits = [
+            i for i in relational_intents
+            if graph_name(i.get("entity") or "") in prefetched_graph
+            and set(i.get("attributes", [])) <= set(SPECULATIVE_RELATIONAL_ATTRIBUTES)
+        ]
+        graph_misses = [i for i in relational_intents if i not in graph_hits]
+
+        futures = {"semantic": self.futures["semantic"]}
+        cancelled = []
+        for stage, hits in (("factual", factual_hits), ("graph", graph_hits)):
+            if stage not in self.futures:
+                continue
+            if hits:
+                futures[stage] = self.futures[stage]
+            else:
+                self.futures[stage].cancel()
+                cancelled.append(stage)
+
+        if factual_misses:
+            futures["factual_miss"] = submit_stage(factual_stage, factual_misses)
+        if graph_misses:
+            futures["graph_miss"] = submit_stage(graph_stage, graph_misses)
+
+        merged = collect_stages(futures, resolve_start, {
+            **DEFAULT_DEADLINES,
+            "factual_miss": DEFAULT_DEADLINES["factual"],
+            "graph_miss": DEFAULT_DEADLINES["graph"],
+            **(deadlines or {}),
+        })
+
+        # Narrow prefetched results to what the router actually asked for
+        factual = []
+        prefetched_factual = {r.get("entity", "").lower(): r for r in merged.get("factual", [])}
+        for intent in factual_hits:
+            result = prefetched_factual.get(intent["entity"].lower())
+            if result:
+                factual.append(_project_factual(result, intent.get("attributes", [])))
+        factual.extend(merged.pop("factual_miss", []))
+
+        graph = []
+        for intent in graph_hits:
+            wanted = set(intent.get("attributes", []))
+            graph.extend(
+                r for r in merged.get("graph", [])
+                if graph_name(r.get("entity", "")) == graph_name(intent["entity"]) and r.get("relation") in wanted
+            )
+        graph.extend(merged.pop("graph_miss", []))
+
+        context = {"query": self.query, "intents": intents_output, **merged, "factual": factual, "graph": graph}
+        context["elapsed_sec"] = round(time.perf_counter() - resolve_start, 3)
+        context["speculation"] = {
+            "entities": self.entities,
+            "factual_hits": len(factual_hits),
+            "factual_misses": len(factual_misses),
+            "graph_hits": len(graph_hits),
+            "graph_misses": len(graph_misses),
+            "cancelled": cancelled,
+            "head_start_sec": round(resolve_start - self.started, 3),
+        }
+        return context
@@ -5,6 +5,8 @@ from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 from tqdm import tqdm
 
+from http_cache import get_http_cache
+
 # ───────────────────────────────
 # CONFIG
 # ───────────────────────────────
@@ -37,10 +39,22 @@ def slugify(url):
     return slug or "page"
 
 def fetch_html(url):
-    """Descarga el HTML de una página con manejo básico de errores."""
+    """Descarga el HTML de una página con manejo básico de errores (vía caché HTTP local)."""
+    cache = get_http_cache()
+    entry, usable = cache.get_fresh(url)
+    if usable:
+        return entry.text
+    if cache.offline:
+        print(f"📴 Sin caché para {url} (modo offline)")
+        return None
+
     try:
-        r = requests.get(url, headers=HEADERS, timeout=15)
+        r = requests.get(url, headers={**HEADERS, **cache.conditional_headers(entry)}, timeout=15)
+        if r.status_code == 304 and entry is not None:
+            cache.revalidated(url, r.headers)
+            return entry.text
         r.raise_for_status()
+        cache.store(url, r.content, r.headers, encoding=r.encoding)
         return r.text
     except Exception as e:
         print(f"⚠️ Error al descargar {url}: {e}")
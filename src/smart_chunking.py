@@ -1,11 +1,12 @@
 import os
 import re
 import json
-import uuid
 from dotenv import load_dotenv, find_dotenv
 from openai import OpenAI
 from tqdm import tqdm
 
+from chunk_ids import with_ids
+
 # ───────────────────────────────
 # CONFIGURACIÓN
 # ───────────────────────────────
@@ -110,13 +111,13 @@ if __name__ == "__main__":
             for i, section in enumerate(sections, 1):
                 section_name, content = parse_section(section)
 
-                record = {
-                    "chunk_id": str(uuid.uuid4()),
+                # Deterministic chunk_id (uuid5 over document, section and text hash)
+                record = with_ids({
                     "document_name": file.replace(".txt", ".md"),
                     "chunk_index": i,
                     "section_name": section_name,
                     "text": content,
-                }
+                })
 
                 f_out.write(json.dumps(record, ensure_ascii=False) + "\n")
 
@@ -0,0 +1,243 @@
+"""
+tracing.py
+──────────────────────────────────────────────
+Lightweight per-request latency tracing for Pokémon RAG system.
+- `request_trace()` opens a trace for one user question
+- `span()` / `@traced()` time a stage (router, stores, prompt, LLM)
+- Spans export as JSON lines; durations feed Prometheus-style histograms
+
+Usage:
+    uv run python src/tracing.py data/traces/spans.jsonl   # p50/p95/p99 + Prometheus text
+──────────────────────────────────────────────
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import bisect
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+# ───────────────────────────────────────────────
+# CONFIG
+# ───────────────────────────────────────────────
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "data/traces/spans.jsonl")
+TRACE_SAMPLE_WINDOW = int(os.getenv("TRACE_SAMPLE_WINDOW", "10000"))
+
+# Prometheus histogram buckets (seconds)
+BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("current_trace", default=None)
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+# ───────────────────────────────────────────────
+# SPANS & TRACES
+# ───────────────────────────────────────────────
+class Span:
+    def __init__(self, name: str, trace: "Trace | None", parent: "Span | None", attrs: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = dict(attrs)
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.error: str | None = None
+
+    def set(self, **attrs):
+        """Attach attributes (token counts, payload sizes, result counts...)."""
+        self.attrs.update(attrs)
+
+    @property
+    def duration_sec(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        t0 = self.trace.t0 if self.trace else self.start
+        return {
+            "trace_id": self.trace.trace_id if self.trace else None,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start - t0) * 1000, 3),
+            "duration_ms": round(self.duration_sec * 1000, 3),
+            "thread": self.thread,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class Trace:
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.timestamp = datetime.now(timezone.utc).isoformat()
+        self.t0 = time.perf_counter()
+        self.spans: List[Span] = []
+        self.error: str | None = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """Finished spans ordered by start time (waterfall order)."""
+        with self._lock:
+            rows = [s.to_dict() for s in self.spans if s.end is not None]
+        return sorted(rows, key=lambda r: r["start_ms"])
+
+    def export_jsonl(self, path: str = TRACE_EXPORT_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for row in self.to_rows():
+                row = {"timestamp": self.timestamp, "trace": self.name, "trace_error": self.error, **row}
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def request_trace(name: str = "request", **attrs):
+    """Open a trace for one user request; spans created inside (and in copied contexts) join it."""
+    trace = Trace(name, attrs)
+    token = _current_trace.set(trace)
+    try:
+        with span(name, **attrs):
+            yield trace
+    except Exception as e:
+        trace.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, activate: bool = True, **attrs):
+    """
+    Time a block. Works with or without an active trace (durations always reach the histograms).
+    Use activate=False around generators so the span does not become the caller's parent.
+    """
+    trace = _current_trace.get()
+    s = Span(name, trace, _current_span.get(), attrs)
+    token = _current_span.set(s) if activate else None
+    try:
+        yield s
+    except Exception as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.end = time.perf_counter()
+        if token is not None:
+            _current_span.reset(token)
+        if trace is not None:
+            trace.add(s)
+        METRICS.observe(name, s.duration_sec)
+
+
+def traced(name: str | None = None):
+    """Decorator form of `span()`."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ───────────────────────────────────────────────
+# HISTOGRAMS
+# ───────────────────────────────────────────────
+class LatencyHistogram:
+    """Cumulative Prometheus buckets plus a sliding sample window for exact percentiles."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+        self.samples = deque(maxlen=TRACE_SAMPLE_WINDOW)
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.n += 1
+        self.samples.append(seconds)
+
+    def percentiles(self) -> Dict[str, float | None]:
+        if not self.samples:
+            return {"p50": None, "p95": None, "p99": None}
+        ordered = sorted(self.samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+        return {f"p{q}": round(pick(q) * 1000, 3) for q in (50, 95, 99)}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            self.histograms.setdefault(name, LatencyHistogram()).observe(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """{span: {count, p50, p95, p99}} with percentiles in milliseconds."""
+        with self._lock:
+            return {name: {"count": h.n, **h.percentiles()} for name, h in sorted(self.histograms.items())}
+
+    def render_prometheus(self, metric: str = "pokedex_span_duration_seconds") -> str:
+        lines = [
+            f"# HELP {metric} Duration of traced pipeline stages.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + [float("inf")], h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{metric}_bucket{{span="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{span="{name}"}} {h.total:.6f}')
+                lines.append(f'{metric}_count{{span="{name}"}} {h.n}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def load_jsonl(path: str = TRACE_EXPORT_PATH) -> MetricsRegistry:
+    """Rebuild histograms from exported spans."""
+    registry = MetricsRegistry()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                registry.observe(row["name"], row["duration_ms"] / 1000)
+    return registry
+
+
+# ───────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────
+if __name__ == "__main__":
+    registry = load_jsonl(sys.argv[1] if len(sys.argv) > 1 else TRACE_EXPORT_PATH)
+    print(f"{'span':<32} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, s in registry.summary().items():
+        print(f"{name:<32} {s['count']:>7} {s['p50']:>10} {s['p95']:>10} {s['p99']:>10}")
+    print()
+    print(registry.render_prometheus())